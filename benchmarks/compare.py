@@ -0,0 +1,63 @@
+"""Compare two benchmark result files
+
+Usage:
+    python benchmarks/compare.py OLD.json NEW.json [--threshold 10]
+
+Prints every timing that is present in both files with the relative change and
+exits with status 1 if any timing got slower by more than the threshold (percent).
+"""
+import argparse
+import json
+import sys
+
+# Keys holding timings where lower is better; throughput keys are higher-is-better
+TIMING_SUFFIXES = ("_ms", "_us")
+THROUGHPUT_SUFFIXES = ("_per_second",)
+
+def flatten(data, prefix=""):
+    values = {}
+    for key, value in data.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            values.update(flatten(value, path))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[path] = value
+    return values
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two Clicky benchmark result files")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=10.0, help="regression threshold in percent")
+    args = parser.parse_args()
+
+    with open(args.old) as f:
+        old = flatten(json.load(f)["results"])
+    with open(args.new) as f:
+        new = flatten(json.load(f)["results"])
+
+    regressions = 0
+    for path in sorted(old.keys() & new.keys()):
+        # Compare median and best-case timings only; means are too noisy
+        if path.endswith(("mean_ms", ".repeat")):
+            continue
+        if path.endswith(TIMING_SUFFIXES):
+            slower = True
+        elif path.endswith(THROUGHPUT_SUFFIXES):
+            slower = False
+        else:
+            continue
+        if not old[path]:
+            continue
+        change = (new[path] - old[path]) / old[path] * 100
+        regressed = change > args.threshold if slower else change < -args.threshold
+        marker = "  REGRESSION" if regressed else ""
+        regressions += regressed
+        print(f"{path:70} {old[path]:>12.3f} -> {new[path]:>12.3f} ({change:+.1f}%){marker}")
+
+    if regressions:
+        print(f"{regressions} regression(s) over {args.threshold}%")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
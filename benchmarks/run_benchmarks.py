@@ -0,0 +1,231 @@
+"""Headless benchmarks for Clicky's hot paths
+
+Usage:
+    python benchmarks/run_benchmarks.py [--quick] [--only NAME ...] [--output FILE]
+
+Results are written as JSON (see benchmarks/compare.py to diff two result files).
+No display is needed: input goes to the in-memory RecordingBackend.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from models.action import Action
+from models.workflow import Workflow
+from services.automation_service import AutomationService
+from services.execution_engine import ExecutionEngine
+from services.input_backends import RecordingBackend
+from services.scheduling_service import SchedulingService
+
+def measure(func, repeat):
+    """Run func repeat times and return min/median/mean wall time in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        start_ns = time.perf_counter_ns()
+        func()
+        samples.append((time.perf_counter_ns() - start_ns) / 1e6)
+    return {
+        "repeat": repeat,
+        "min_ms": min(samples),
+        "median_ms": statistics.median(samples),
+        "mean_ms": statistics.fmean(samples),
+    }
+
+def make_workflow(action_count, name="Benchmark"):
+    """Workflow cycling through the common action types, with pacing turned off"""
+    templates = [
+        ("click", {"x": 100, "y": 200}),
+        ("move mouse to", {"x": 300, "y": 400}),
+        ("keyboard", {"keys": "hello"}),
+        ("press key", {"key": "enter"}),
+        ("scroll", {"amount": -3, "x": 10, "y": 20}),
+    ]
+    workflow = Workflow(name)
+    workflow.pacing.mode = "fast"
+    for i in range(action_count):
+        action_type, params = templates[i % len(templates)]
+        workflow.add_action(Action(action_type, **params))
+    return workflow
+
+def bench_execute(quick):
+    """AutomationService.execute_workflow on a recording backend"""
+    results = {}
+    for size in ([10, 1000] if quick else [10, 1000, 10000]):
+        service = AutomationService(RecordingBackend())
+        workflow = make_workflow(size)
+        # The first run compiles and caches the plan; report it separately
+        cold = measure(lambda: service.execute_workflow(workflow), 1)
+        warm = measure(lambda: service.execute_workflow(workflow), 3 if quick else 10)
+        results[str(size)] = {
+            "cold_ms": cold["min_ms"],
+            "warm": warm,
+            "actions_per_second": size / (warm["median_ms"] / 1000),
+        }
+        service.script_runner.shutdown()
+    return results
+
+def bench_engine(quick):
+    """Concurrent runs submitted to one ExecutionEngine sharing the input lock"""
+    results = {}
+    for runs in ([50] if quick else [50, 500]):
+        engine = ExecutionEngine(RecordingBackend(), workers=4, max_queue=runs)
+        workflow = make_workflow(20)
+        engine.service.execute_workflow(workflow)
+
+        def submit_all():
+            requests = [engine.submit(workflow) for _ in range(runs)]
+            for request in requests:
+                request.result()
+
+        timing = measure(submit_all, 3)
+        stats = engine.stats()
+        engine.shutdown()
+        results[str(runs)] = {
+            "batch": timing,
+            "runs_per_second": runs / (timing["median_ms"] / 1000),
+            "avg_queue_wait_ms": stats["avg_queue_wait_ms"],
+            "max_input_wait_ms": stats["max_input_wait_ms"],
+        }
+    return results
+
+def bench_persistence(quick):
+    """Workflow.save, Workflow.load and Workflow.from_dict across workflow sizes"""
+    results = {}
+    sizes = [10, 1000, 10000] if quick else [10, 100, 1000, 10000, 100000]
+    directory = tempfile.mkdtemp(prefix="clicky-bench-")
+    try:
+        for size in sizes:
+            workflow = make_workflow(size)
+            data = workflow.to_dict()
+            filepath = os.path.join(directory, f"workflow_{size}.json")
+            repeat = 3 if size >= 10000 or quick else 20
+            results[str(size)] = {
+                "save": measure(lambda: workflow.save(filepath), repeat),
+                "load": measure(lambda: Workflow.load(filepath), repeat),
+                "from_dict": measure(lambda: Workflow.from_dict(data), repeat),
+                "file_bytes": os.path.getsize(filepath),
+            }
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return results
+
+def bench_list_workflows(quick):
+    """WorkflowController.list_workflows on directories of many workflow files"""
+    results = {}
+    for count in ([1000] if quick else [1000, 5000, 20000]):
+        directory = tempfile.mkdtemp(prefix="clicky-bench-")
+        previous = os.environ.get("LOCALAPPDATA")
+        os.environ["LOCALAPPDATA"] = directory
+        try:
+            from controllers.workflow_controller import WorkflowController
+            controller = WorkflowController()
+            workflow = make_workflow(5)
+            for i in range(count):
+                workflow.name = f"Workflow {i}"
+                controller.save_workflow(workflow, workflow.name)
+            results[str(count)] = measure(controller.list_workflows, 3 if quick else 10)
+        finally:
+            if previous is None:
+                del os.environ["LOCALAPPDATA"]
+            else:
+                os.environ["LOCALAPPDATA"] = previous
+            shutil.rmtree(directory, ignore_errors=True)
+    return results
+
+def bench_scheduler(quick):
+    """SchedulingService setup cost and trigger latency with many idle jobs registered"""
+    results = {}
+    service = SchedulingService()
+    service.start_scheduler()
+    for jobs in ([100, 1000] if quick else [100, 1000, 10000]):
+        service.clear_jobs()
+        far_future = datetime.now() + timedelta(days=1)
+        workflows = []
+        for i in range(jobs):
+            workflow = Workflow(f"Idle {i}")
+            workflow.add_scheduled_execution(far_future, None, 1)
+            workflows.append(workflow)
+
+        start_ns = time.perf_counter_ns()
+        for workflow in workflows:
+            service.schedule_workflow(workflow, lambda: None)
+        schedule_ms = (time.perf_counter_ns() - start_ns) / 1e6
+
+        fired = threading.Event()
+        fired_at = []
+        due = datetime.now().replace(microsecond=0) + timedelta(seconds=2)
+        probe = Workflow("Probe")
+        probe.add_scheduled_execution(due, None, 1)
+
+        def on_trigger():
+            fired_at.append(datetime.now())
+            fired.set()
+
+        service.schedule_workflow(probe, on_trigger)
+        fired.wait(10)
+        results[str(jobs)] = {
+            "schedule_all_ms": schedule_ms,
+            "schedule_per_job_us": schedule_ms * 1000 / jobs,
+            "trigger_latency_ms": (fired_at[0] - due).total_seconds() * 1000 if fired_at else None,
+        }
+    service.clear_jobs()
+    return results
+
+BENCHMARKS = {
+    "execute_workflow": bench_execute,
+    "execution_engine": bench_engine,
+    "persistence": bench_persistence,
+    "list_workflows": bench_list_workflows,
+    "scheduler": bench_scheduler,
+}
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+            capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except Exception:
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Run Clicky benchmarks and write the results as JSON")
+    parser.add_argument("--quick", action="store_true", help="smaller sizes and fewer repeats")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="benchmarks to run")
+    parser.add_argument("--output", default="benchmark_results.json", help="where to write the JSON results")
+    args = parser.parse_args()
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "quick": args.quick,
+        },
+        "results": {},
+    }
+    for name in args.only or BENCHMARKS:
+        print(f"Running {name}...", flush=True)
+        start = time.perf_counter()
+        report["results"][name] = BENCHMARKS[name](args.quick)
+        print(f"  done in {time.perf_counter() - start:.1f}s")
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,34 @@
 import os
+import threading
 from models.workflow import Workflow
 
+class WorkflowCache:
+    """Workflows loaded from their files, loaded again only once a file changes
+
+    Scheduled runs read their workflow when they are due. Handing back the same
+    Workflow while the file is unchanged lets the engine reuse its compiled plan.
+    """
+
+    def __init__(self):
+        self.workflows = {}
+        self.lock = threading.Lock()
+
+    def load(self, path):
+        mtime_ns = os.stat(path).st_mtime_ns
+        with self.lock:
+            cached = self.workflows.get(path)
+            if cached is not None and cached[0] == mtime_ns:
+                return cached[1]
+        workflow = Workflow.load(path)
+        with self.lock:
+            self.workflows[path] = (mtime_ns, workflow)
+        return workflow
+
+    def discard(self, path):
+        with self.lock:
+            self.workflows.pop(path, None)
+
+
 class WorkflowController:
     def __init__(self):
         appdata_local = os.environ.get('LOCALAPPDATA')
@@ -16,13 +44,16 @@ class WorkflowController:
         if not os.path.exists(self.workflows_dir):
             os.makedirs(self.workflows_dir)
 
+    def workflow_path(self, filename):
+        return os.path.abspath(os.path.join(self.workflows_dir, filename + ".json"))
+
     def save_workflow(self, workflow, filename):
-        filepath = os.path.join(self.workflows_dir, filename + ".json")
+        filepath = self.workflow_path(filename)
         workflow.save(filepath)
+        return filepath
 
     def load_workflow(self, filename):
-        filepath = os.path.join(self.workflows_dir, filename + ".json")
-        return Workflow.load(filepath)
+        return Workflow.load(self.workflow_path(filename))
 
     def list_workflows(self):
         if not os.path.exists(self.workflows_dir):
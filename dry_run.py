@@ -0,0 +1,62 @@
+"""Dry-run stored workflows in virtual time, without a display or real input
+
+Usage:
+    python dry_run.py [WORKFLOW.json ...] [--screen 1920x1080] [--json]
+
+With no files, every workflow in the workflows directory is checked. Exits with
+status 1 if any workflow fails or uses coordinates outside the screen.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+from models.workflow import Workflow
+from services.simulation import simulate_workflow
+
+def parse_screen(value):
+    try:
+        width, height = (int(part) for part in value.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected WIDTHxHEIGHT, got '{value}'")
+    return width, height
+
+def main():
+    parser = argparse.ArgumentParser(description="Dry-run Clicky workflows in virtual time")
+    parser.add_argument("files", nargs="*", help="workflow files (default: workflows/*.json)")
+    parser.add_argument("--screen", type=parse_screen, default=(1920, 1080), help="screen size, e.g. 2560x1440")
+    parser.add_argument("--json", action="store_true", help="print full results, including events, as JSON")
+    args = parser.parse_args()
+
+    files = args.files or sorted(glob.glob(os.path.join("workflows", "*.json")))
+    results = []
+    failed = 0
+    for filepath in files:
+        try:
+            workflow = Workflow.load(filepath)
+        except Exception as e:
+            print(f"{filepath}: cannot load: {e}")
+            failed += 1
+            continue
+        result = simulate_workflow(workflow, *args.screen)
+        failed += not result.ok
+        if args.json:
+            results.append(dict(result.to_dict(), file=filepath))
+            continue
+        status = "ok" if result.ok else "FAILED"
+        print(f"{filepath}: {status}, {result.duration:.2f} s, {len(result.events)} events")
+        if result.error:
+            print(f"  error: {result.error}")
+        for index, x, y in result.out_of_bounds:
+            where = f"step {index + 1}" if index is not None else "pacing settle region"
+            print(f"  {where}: ({x}, {y}) is outside the {args.screen[0]}x{args.screen[1]} screen")
+        for note in result.notes:
+            print(f"  note: {note}")
+
+    if args.json:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
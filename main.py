@@ -3,6 +3,7 @@ import os
 from PyQt6.QtWidgets import QApplication
 from ui.main_window import MainWindow
 from models.settings import Settings
+from services.scheduling_service import get_scheduler
 
 def get_application_path():
     """Get the base path for the application, works for dev and PyInstaller"""
@@ -50,6 +51,9 @@ def main():
     settings = Settings()
     settings.load(settings_path)
     
+    # Open the scheduler with its journal, so schedules from the last session can be restored
+    get_scheduler(os.path.join(data_dir, "scheduler_journal.jsonl"))
+    
     # Create and show main window
     main_window = MainWindow(settings)
     main_window.show()
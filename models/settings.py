@@ -5,6 +5,7 @@ class Settings:
         self.run_in_background = False
         self.auto_load_last_workflow = True
         self.theme = "Default"
+        self.input_backend = "pyautogui"
 
     def save(self, filepath):
         with open(filepath, 'w') as f:
@@ -3,10 +3,19 @@ from .action import Action
 from datetime import datetime
 
 class ScheduledExecution:
-    def __init__(self, execution_datetime=None, repeat_interval=None, execution_count=0):
+    # What to do when runs were missed (the app was busy, or the machine slept):
+    # run once late, drop them, or run up to catch_up_limit of them
+    MISFIRE_POLICIES = ("fire_once", "skip", "catch_up")
+
+    def __init__(self, execution_datetime=None, repeat_interval=None, execution_count=0,
+                 misfire_policy="fire_once", catch_up_limit=3, cron=None):
         self.execution_datetime = execution_datetime
         self.repeat_interval = repeat_interval
         self.execution_count = execution_count
+        self.misfire_policy = misfire_policy if misfire_policy in self.MISFIRE_POLICIES else "fire_once"
+        self.catch_up_limit = catch_up_limit
+        # A cron expression ("0 9 * * mon-fri") replaces the repeat interval and daily time
+        self.cron = cron or None
     
     def to_dict(self):
         execution_datetime = self.execution_datetime
@@ -16,7 +25,10 @@ class ScheduledExecution:
         return {
             "execution_datetime": execution_datetime,
             "repeat_interval": self.repeat_interval,
-            "execution_count": self.execution_count
+            "execution_count": self.execution_count,
+            "misfire_policy": self.misfire_policy,
+            "catch_up_limit": self.catch_up_limit,
+            "cron": self.cron
         }
     
     @classmethod
@@ -31,7 +43,47 @@ class ScheduledExecution:
         return cls(
             execution_datetime=execution_datetime,
             repeat_interval=data.get("repeat_interval"),
-            execution_count=data.get("execution_count", 0)
+            execution_count=data.get("execution_count", 0),
+            misfire_policy=data.get("misfire_policy", "fire_once"),
+            catch_up_limit=int(data.get("catch_up_limit", 3)),
+            cron=data.get("cron")
+        )
+
+class Pacing:
+    MODES = ("fixed", "fast", "adaptive")
+
+    def __init__(self, mode="fixed", delay=0.5, min_delay=0.05, settle_region=None,
+                 settle_interval=0.05, settle_timeout=2.0):
+        self.mode = mode if mode in self.MODES else "fixed"
+        self.delay = delay
+        self.min_delay = min_delay
+        self.settle_region = settle_region
+        self.settle_interval = settle_interval
+        self.settle_timeout = settle_timeout
+
+    def to_dict(self):
+        return {
+            "mode": self.mode,
+            "delay": self.delay,
+            "min_delay": self.min_delay,
+            "settle_region": list(self.settle_region) if self.settle_region else None,
+            "settle_interval": self.settle_interval,
+            "settle_timeout": self.settle_timeout
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        settle_region = data.get("settle_region")
+        if settle_region:
+            settle_region = tuple(int(value) for value in settle_region)
+
+        return cls(
+            mode=data.get("mode", "fixed"),
+            delay=float(data.get("delay", 0.5)),
+            min_delay=float(data.get("min_delay", 0.05)),
+            settle_region=settle_region,
+            settle_interval=float(data.get("settle_interval", 0.05)),
+            settle_timeout=float(data.get("settle_timeout", 2.0))
         )
 
 class Workflow:
@@ -42,6 +94,8 @@ class Workflow:
         self.repeat_interval = None
         self.execution_count = 0
         self.scheduled_executions = []
+        self.pacing = Pacing()
+        self.persistent_shell = False
 
     def add_action(self, action):
         self.actions.append(action)
@@ -50,17 +104,27 @@ class Workflow:
         if 0 <= index < len(self.actions):
             del self.actions[index]
     
-    def add_scheduled_execution(self, execution_datetime=None, repeat_interval=None, execution_count=0):
+    def add_scheduled_execution(self, execution_datetime=None, repeat_interval=None, execution_count=0,
+                                misfire_policy="fire_once", catch_up_limit=3, cron=None):
         """Add a new scheduled execution time for this workflow"""
-        self.scheduled_executions.append(
-            ScheduledExecution(execution_datetime, repeat_interval, execution_count)
-        )
+        self.scheduled_executions.append(ScheduledExecution(
+            execution_datetime, repeat_interval, execution_count, misfire_policy, catch_up_limit, cron
+        ))
     
     def remove_scheduled_execution(self, index):
         """Remove a scheduled execution by index"""
         if 0 <= index < len(self.scheduled_executions):
             del self.scheduled_executions[index]
 
+    def analyze(self, screen=None, **options):
+        """Estimate run time and find suspicious steps without running anything
+
+        screen is (left, top, width, height) to check coordinates against.
+        Returns a WorkflowAnalysis.
+        """
+        from services.workflow_analyzer import analyze_workflow
+        return analyze_workflow(self, screen, **options)
+
     def to_dict(self):
         if not self.scheduled_executions and self.start_time:
             self.add_scheduled_execution(
@@ -75,7 +139,9 @@ class Workflow:
             "start_time": self.start_time,
             "repeat_interval": self.repeat_interval,
             "execution_count": self.execution_count,
-            "scheduled_executions": [execution.to_dict() for execution in self.scheduled_executions]
+            "scheduled_executions": [execution.to_dict() for execution in self.scheduled_executions],
+            "pacing": self.pacing.to_dict(),
+            "persistent_shell": self.persistent_shell
         }
 
     @classmethod
@@ -86,6 +152,8 @@ class Workflow:
         workflow.start_time = data.get("start_time")
         workflow.repeat_interval = data.get("repeat_interval")
         workflow.execution_count = data.get("execution_count", 0)
+        workflow.pacing = Pacing.from_dict(data.get("pacing", {}))
+        workflow.persistent_shell = data.get("persistent_shell", False)
         
         if "scheduled_executions" in data:
             workflow.scheduled_executions = [
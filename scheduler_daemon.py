@@ -0,0 +1,192 @@
+"""Run scheduled workflows headless, without the GUI or PyQt6
+
+Usage:
+    python scheduler_daemon.py [--workflows-dir DIR] [--journal FILE] [--backend NAME] [--rescan SECONDS] [--list]
+
+Schedules every scheduled execution of every workflow in the workflows directory
+and runs them until interrupted (Ctrl+C or SIGTERM). Scheduler state is kept in
+the app's journal, keyed by workflow file like the app's, so run counts and
+pending runs carry over between restarts and between the app and the daemon.
+Workflow files that have not changed since the journal last saw them are not
+read at startup. The directory is scanned again every --rescan seconds to pick
+up edited workflows. --list prints the upcoming runs without changing anything.
+"""
+import argparse
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+from datetime import datetime
+from controllers.workflow_controller import WorkflowCache, WorkflowController
+from models.settings import Settings
+from models.workflow import Workflow
+from services.execution_engine import get_engine, shutdown_engine
+from services.schedule_journal import ScheduleJournal
+from services.scheduling_service import SchedulingService, get_scheduler, shutdown_scheduler
+
+def data_directory():
+    """The directory main.py uses for settings: %LOCALAPPDATA%/Clicky, or the application directory"""
+    appdata_local = os.environ.get('LOCALAPPDATA')
+    if appdata_local:
+        return os.path.join(appdata_local, "Clicky")
+    return os.path.dirname(os.path.abspath(__file__))
+
+def log(message):
+    print(f"{datetime.now():%Y-%m-%d %H:%M:%S} {message}", flush=True)
+
+class SchedulerDaemon:
+    """Keeps the scheduler's jobs in step with the workflow files in workflows_dir
+
+    Jobs are keyed by the workflow file's absolute path, as the app's windows
+    key them, so either can pick up the other's journal entries. With
+    backend_name None nothing is ever run (used by --list).
+    """
+
+    def __init__(self, workflows_dir, scheduler, backend_name):
+        self.workflows_dir = os.path.abspath(workflows_dir)
+        self.scheduler = scheduler
+        self.journal = scheduler.journal
+        self.backend_name = backend_name
+        self.loaded = WorkflowCache()
+
+    def run_callback(self, path):
+        if self.backend_name is None:
+            return lambda: None
+
+        def run():
+            # Called from the scheduler thread; the file is read when the run is due, not before
+            try:
+                workflow = self.loaded.load(path)
+            except Exception as e:
+                log(f"Could not load '{path}': {e}")
+                return
+            log(f"Running '{workflow.name}'")
+            try:
+                # The engine (and its input library) is only loaded once something is due. Never wait
+                # on a full run queue here, it would hold up every other trigger
+                get_engine(self.backend_name).submit(
+                    workflow, on_finished=lambda request: self.on_finished(path, request), block=False, key=path,
+                    on_log=lambda line: log(f"{workflow.name}: {line}")
+                )
+            except queue.Full:
+                log(f"Run queue is full, skipping this run of '{workflow.name}'")
+        return run
+
+    def on_finished(self, path, request):
+        if request.error is not None:
+            log(f"'{request.workflow.name}' failed: {request.error}")
+        else:
+            seconds = (request.finished_ns - request.started_ns) / 1e9
+            log(f"'{request.workflow.name}' finished in {seconds:.2f} s")
+        self.scheduler.record_finished(path, request.error)
+
+    def restore(self):
+        """Re-create the jobs in the journal, without reading any workflow files"""
+        return self.scheduler.restore(lambda path: self.run_callback(path) if os.path.isfile(path) else None)
+
+    def scan(self):
+        """Schedule workflows whose files are new or changed since the journal last saw them"""
+        sources = dict(self.journal.sources)
+        # Keys with journal entries, e.g. workflows started from the app, which records no source
+        scheduled_keys = {key for key, _ in self.journal.entries}
+        seen = set()
+        scheduled = 0
+        for entry in os.scandir(self.workflows_dir):
+            if not entry.name.endswith(".json"):
+                continue
+            path = entry.path
+            seen.add(path)
+            mtime_ns = entry.stat().st_mtime_ns
+            if sources.get(path) == mtime_ns:
+                continue
+            if path not in sources and path in scheduled_keys:
+                # Adopt the app's schedule (restore() already re-created its jobs) so its counts carry over
+                self.journal.record_source(path, mtime_ns)
+                continue
+            try:
+                workflow = Workflow.load(path)
+            except Exception as e:
+                log(f"Could not load '{path}': {e}")
+                continue
+
+            if workflow.scheduled_executions or workflow.start_time:
+                try:
+                    self.scheduler.schedule_workflow(workflow, self.run_callback(path), path)
+                except ValueError as e:
+                    log(f"Could not schedule '{workflow.name}': {e}")
+                    continue
+                scheduled += 1
+                log(f"Scheduled '{workflow.name}' from {entry.name}")
+            else:
+                self.scheduler.clear_jobs_for_workflow(path)
+            self.journal.record_source(path, mtime_ns)
+
+        for path in sources:
+            if os.path.dirname(path) == self.workflows_dir and path not in seen:
+                self.scheduler.clear_jobs_for_workflow(path)
+                self.loaded.discard(path)
+                log(f"{os.path.basename(path)} was removed, dropping its schedules")
+        return scheduled
+
+    def upcoming(self):
+        """(timestamp, workflow file) of every pending job, soonest first"""
+        with self.scheduler.condition:
+            return sorted((job.next_run, os.path.basename(key))
+                          for key, jobs in self.scheduler.jobs.items() for job in jobs)
+
+def main():
+    parser = argparse.ArgumentParser(description="Run scheduled Clicky workflows without the GUI")
+    parser.add_argument("--workflows-dir", help="directory of workflow files (default: the app's workflows directory)")
+    parser.add_argument("--journal", help="scheduler journal (default: scheduler_journal.jsonl in the data directory)")
+    parser.add_argument("--backend", help="input backend (default: the one chosen in the app's settings)")
+    parser.add_argument("--rescan", type=float, default=60.0, help="seconds between scans for changed workflows")
+    parser.add_argument("--list", action="store_true", help="print the upcoming runs and exit, changing nothing")
+    args = parser.parse_args()
+
+    # Paths given on the command line are relative to where we were started
+    workflows_dir = os.path.abspath(args.workflows_dir) if args.workflows_dir else None
+    journal_path = os.path.abspath(args.journal) if args.journal else None
+    # The app's own relative paths (the default workflows directory among them) are relative to it, as in main.py
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    start_ns = time.perf_counter_ns()
+    data_dir = data_directory()
+    settings = Settings()
+    settings.load(os.path.join(data_dir, "settings.json"))
+    workflows_dir = workflows_dir or WorkflowController().workflows_dir
+    journal_path = journal_path or os.path.join(data_dir, "scheduler_journal.jsonl")
+
+    if args.list:
+        # Work out the schedule on a scheduler whose thread never starts and whose journal is never written
+        scheduler = SchedulingService(journal=ScheduleJournal(journal_path, read_only=True))
+        daemon = SchedulerDaemon(workflows_dir, scheduler, None)
+        daemon.restore()
+        daemon.scan()
+        for next_run, name in daemon.upcoming():
+            print(f"{datetime.fromtimestamp(next_run):%Y-%m-%d %H:%M:%S}  {name}")
+        return
+
+    scheduler = get_scheduler(journal_path)
+    if scheduler.journal is None:
+        sys.exit(1)
+    daemon = SchedulerDaemon(workflows_dir, scheduler, args.backend or settings.input_backend)
+    try:
+        restored = daemon.restore()
+        scheduled = daemon.scan()
+        log(f"Ready in {(time.perf_counter_ns() - start_ns) / 1e6:.0f} ms: {restored} execution(s) restored, "
+            f"{scheduled} workflow(s) scheduled from {daemon.workflows_dir}")
+
+        stop = threading.Event()
+        signal.signal(signal.SIGINT, lambda *_: stop.set())
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+        # A timed wait also keeps Ctrl+C responsive on Windows
+        while not stop.wait(max(1.0, args.rescan)):
+            daemon.scan()
+    finally:
+        shutdown_scheduler()
+        shutdown_engine()
+    log("Stopped")
+
+if __name__ == "__main__":
+    main()
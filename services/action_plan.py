@@ -0,0 +1,419 @@
+INPUT_OPS = ("inject", "inject_at_match", "hold", "text")
+CONTROL_OPS = ("repeat", "run_block")
+
+class PlanStep:
+    def __init__(self, index, action, op_name, func, args, delay=None):
+        self.index = index
+        self.action = action
+        self.action_type = action.action_type
+        self.op_name = op_name
+        self.func = func
+        self.args = args
+        self.delay = delay
+
+    @property
+    def is_input(self):
+        return self.op_name == "inject"
+
+    @property
+    def uses_input(self):
+        return self.op_name in INPUT_OPS
+
+    @property
+    def is_control(self):
+        return self.op_name in CONTROL_OPS
+
+    @property
+    def events(self):
+        return self.args[0] if self.is_input else None
+
+    @property
+    def body(self):
+        """Nested steps of a repeat or run block step"""
+        return self.args[0] if self.is_control else None
+
+    def run(self, context):
+        self.func(context, *self.args)
+
+
+class BatchStep(PlanStep):
+    """Adjacent input steps with no pacing between them, injected as one batch"""
+
+    def __init__(self, steps):
+        first = steps[0]
+        events = [event for step in steps for event in step.events]
+        PlanStep.__init__(self, first.index, first.action, "inject", first.func, (events,), steps[-1].delay)
+        self.action_type = "batch"
+        self.steps = steps
+
+
+class ActionPlan:
+    def __init__(self, steps):
+        self.steps = steps
+
+    def __len__(self):
+        return len(self.steps)
+
+    def __iter__(self):
+        return iter(self.steps)
+
+
+def _param(action, name, convert, default=None, required=True):
+    if name not in action.params:
+        if required:
+            raise ValueError(f"Action '{action.action_type}' is missing parameter '{name}'")
+        return default
+    value = action.params[name]
+    try:
+        return convert(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Action '{action.action_type}' has an invalid value for '{name}': {value!r}")
+
+
+def _non_negative(convert):
+    def _convert(value):
+        value = convert(value)
+        if value < 0:
+            raise ValueError(value)
+        return value
+    return _convert
+
+
+# Screen waits poll no faster than this; at 0 they would re-check the same captured frame nonstop
+MIN_POLL_INTERVAL = 0.01
+
+def _poll_interval(value):
+    value = float(value)
+    if not value >= MIN_POLL_INTERVAL:
+        raise ValueError(value)
+    return value
+
+
+def _inject(*events):
+    return "inject", (list(events),)
+
+
+TARGETS = ("coordinates", "match")
+
+def _target(value):
+    if value not in TARGETS:
+        raise ValueError(value)
+    return value
+
+
+def _inject_at(action, build):
+    """Inject build(x, y)'s events, at x/y or offset by x/y from the last image match"""
+    if _param(action, "target", _target, default="coordinates", required=False) == "match":
+        x = _param(action, "x", int, default=0, required=False)
+        y = _param(action, "y", int, default=0, required=False)
+        return "inject_at_match", (build, x, y)
+    return _inject(*build(_param(action, "x", int), _param(action, "y", int)))
+
+
+def _compile_click(action):
+    clicks = _param(action, "clicks", int, default=1, required=False)
+    return _inject_at(action, lambda x, y: [("click", (x, y, clicks, "left"))])
+
+
+def _compile_hold(action):
+    return "hold", (
+        _param(action, "x", int),
+        _param(action, "y", int),
+        _param(action, "duration", _non_negative(float)),
+    )
+
+
+def _compile_scroll(action):
+    amount = _param(action, "amount", int)
+    return _inject_at(action, lambda x, y: [("click", (x, y, 1, "left")), ("scroll", (amount, x, y))])
+
+
+def _compile_drag(action):
+    x1 = _param(action, "x1", int)
+    y1 = _param(action, "y1", int)
+    x2 = _param(action, "x2", int)
+    y2 = _param(action, "y2", int)
+    return _inject(("move_to", (x1, y1)), ("drag_to", (x2, y2, "left")))
+
+
+KEYBOARD_MODES = ("keys", "bulk", "paste")
+
+def _keyboard_mode(value):
+    if value not in KEYBOARD_MODES:
+        raise ValueError(value)
+    return value
+
+
+def _compile_keyboard(action):
+    keys = _param(action, "keys", str)
+    mode = _param(action, "mode", _keyboard_mode, default="keys", required=False)
+    if mode == "keys":
+        return _inject(("write", (keys,)))
+    return "text", (keys, mode)
+
+
+SCRIPT_MODES = ("wait", "join later", "background")
+
+def _script_mode(value):
+    if value not in SCRIPT_MODES:
+        raise ValueError(value)
+    return value
+
+
+def _compile_script(action):
+    return "script", (
+        _param(action, "command", str),
+        _param(action, "mode", _script_mode, default="wait", required=False),
+        _param(action, "timeout", _non_negative(float), required=False),
+        _param(action, "isolated", bool, default=False, required=False),
+    )
+
+
+def _compile_wait(action):
+    return "wait", (_param(action, "time", _non_negative(float)),)
+
+
+def _compile_press_key(action):
+    return _inject(("press", (_param(action, "key", str),)))
+
+
+def _compile_move(action):
+    return _inject_at(action, lambda x, y: [("move_to", (x, y))])
+
+
+def _region(value):
+    region = tuple(int(part) for part in value)
+    if len(region) != 4 or region[2] <= 0 or region[3] <= 0:
+        raise ValueError(value)
+    return region
+
+
+def _similarity(value):
+    value = float(value)
+    if not 0 < value <= 1:
+        raise ValueError(value)
+    return value
+
+
+def _compile_wait_image(action):
+    image = _param(action, "image", str)
+    if not image.strip():
+        raise ValueError(f"Action '{action.action_type}' needs a reference image")
+    return "wait_image", (
+        image,
+        _param(action, "region", _region, required=False),
+        _param(action, "timeout", _non_negative(float), default=10.0, required=False),
+        _param(action, "interval", _poll_interval, default=0.1, required=False),
+        _param(action, "threshold", _similarity, default=0.9, required=False),
+    )
+
+
+CHANGE_MODES = ("change", "stable")
+
+def _change_mode(value):
+    if value not in CHANGE_MODES:
+        raise ValueError(value)
+    return value
+
+
+def _compile_wait_change(action):
+    interval = _param(action, "interval", _poll_interval, default=0.1, required=False)
+    return "wait_change", (
+        _param(action, "region", _region),
+        _param(action, "mode", _change_mode, default="change", required=False),
+        _param(action, "timeout", _non_negative(float), default=10.0, required=False),
+        interval,
+        _param(action, "tolerance", _non_negative(float), default=0.01, required=False),
+        _param(action, "stable_for", _non_negative(float), default=interval, required=False),
+    )
+
+
+ACTION_COMPILERS = {
+    "click": _compile_click,
+    "hold": _compile_hold,
+    "scroll": _compile_scroll,
+    "drag": _compile_drag,
+    "keyboard": _compile_keyboard,
+    "script": _compile_script,
+    "wait for": _compile_wait,
+    "press key": _compile_press_key,
+    "move mouse to": _compile_move,
+    "wait for image": _compile_wait_image,
+    "wait for change": _compile_wait_change,
+}
+
+
+def compile_action(action, ops, index=0):
+    """Validate an action's params and bind it to the matching operation on ops"""
+    compiler = ACTION_COMPILERS.get(action.action_type)
+    if compiler is None:
+        raise ValueError(f"Unknown action type '{action.action_type}'")
+    op_name, args = compiler(action)
+    delay = _param(action, "delay", _non_negative(float), required=False)
+    return PlanStep(index, action, op_name, getattr(ops, "op_" + op_name), args, delay)
+
+
+def _paced(step, pacing):
+    if step.delay is not None:
+        return step.delay > 0
+    if pacing.mode == "fast":
+        return False
+    if pacing.mode == "adaptive":
+        return True
+    return pacing.delay > 0
+
+
+def batch_input_steps(steps, pacing):
+    """Coalesce runs of input steps that would have no pacing between them"""
+    batched = []
+    run = []
+    for step in steps:
+        if step.is_input and run and not _paced(run[-1], pacing):
+            run.append(step)
+            continue
+        if run:
+            batched.append(run[0] if len(run) == 1 else BatchStep(run))
+            run = []
+        if step.is_input:
+            run.append(step)
+        else:
+            batched.append(step)
+    if run:
+        batched.append(run[0] if len(run) == 1 else BatchStep(run))
+    return batched
+
+
+def _compile_repeat(action):
+    times = _param(action, "times", _non_negative(int), default=0, required=False)
+    duration = _param(action, "duration", _non_negative(float), required=False)
+    if not times and not duration:
+        raise ValueError(f"Action '{action.action_type}' needs a number of times or a duration")
+    return times, duration
+
+
+def _block_label(action):
+    label = _param(action, "label", str).strip()
+    if not label:
+        raise ValueError(f"Action '{action.action_type}' needs a label")
+    return label
+
+
+BLOCK_ENDS = {"repeat": "end repeat", "block": "end block"}
+
+def parse_structure(actions):
+    """Match repeat/block markers in the flat action list
+
+    Returns (nodes, blocks): nodes is the top-level sequence, each node either an
+    action index or (index, children) for a repeat, and blocks maps each block
+    label to (index, children). Block bodies only run through 'run block'.
+    """
+    root = []
+    stack = [(None, root)]
+    blocks = {}
+    for index, action in enumerate(actions):
+        action_type = action.action_type
+        if action_type in BLOCK_ENDS:
+            children = []
+            stack[-1][1].append((index, children))
+            stack.append((index, children))
+        elif action_type in BLOCK_ENDS.values():
+            start = stack[-1][0]
+            if start is None or BLOCK_ENDS[actions[start].action_type] != action_type:
+                raise ValueError(f"Step {index + 1}: '{action_type}' has no matching start")
+            stack.pop()
+        else:
+            stack[-1][1].append(index)
+
+    if len(stack) > 1:
+        start = stack[-1][0]
+        raise ValueError(
+            f"Step {start + 1}: '{actions[start].action_type}' is never closed with "
+            f"'{BLOCK_ENDS[actions[start].action_type]}'"
+        )
+
+    def collect_blocks(nodes):
+        kept = []
+        for node in nodes:
+            if isinstance(node, tuple):
+                collect_blocks(node[1])
+                if actions[node[0]].action_type == "block":
+                    try:
+                        label = _block_label(actions[node[0]])
+                    except ValueError as e:
+                        raise ValueError(f"Step {node[0] + 1}: {e}")
+                    if label in blocks:
+                        raise ValueError(f"Step {node[0] + 1}: block '{label}' is defined twice")
+                    blocks[label] = node
+                    continue
+            kept.append(node)
+        nodes[:] = kept
+
+    collect_blocks(root)
+    return root, blocks
+
+
+def _does_nothing(steps):
+    """True if steps are empty or only run blocks that are themselves empty"""
+    return all(step.op_name == "run_block" and _does_nothing(step.args[0]) for step in steps)
+
+
+class _PlanCompiler:
+    def __init__(self, workflow, ops, batch):
+        self.workflow = workflow
+        self.ops = ops
+        self.batch = batch
+        self.block_steps = {}
+        self.compiling = set()
+
+    def compile(self):
+        nodes, self.blocks = parse_structure(self.workflow.actions)
+        return self.compile_nodes(nodes)
+
+    def compile_nodes(self, nodes):
+        steps = []
+        for node in nodes:
+            index, children = node if isinstance(node, tuple) else (node, None)
+            action = self.workflow.actions[index]
+            try:
+                if children is not None:
+                    steps.append(self.compile_repeat(index, action, children))
+                elif action.action_type == "run block":
+                    steps.append(self.compile_run_block(index, action))
+                else:
+                    steps.append(compile_action(action, self.ops, index))
+            except ValueError as e:
+                if str(e).startswith("Step "):
+                    raise
+                raise ValueError(f"Step {index + 1}: {e}")
+        if self.batch:
+            steps = batch_input_steps(steps, self.workflow.pacing)
+        return steps
+
+    def compile_repeat(self, index, action, children):
+        times, duration = _compile_repeat(action)
+        delay = _param(action, "delay", _non_negative(float), required=False)
+        body = self.compile_nodes(children)
+        if _does_nothing(body):
+            # A timed repeat of nothing would spin until its deadline
+            raise ValueError("Action 'repeat' has nothing to repeat")
+        return PlanStep(index, action, "repeat", self.ops.op_repeat, (body, times, duration), delay)
+
+    def compile_run_block(self, index, action):
+        label = _block_label(action)
+        if label not in self.blocks:
+            raise ValueError(f"Action 'run block' refers to unknown block '{label}'")
+        if label in self.compiling:
+            raise ValueError(f"Block '{label}' runs itself")
+        if label not in self.block_steps:
+            self.compiling.add(label)
+            try:
+                self.block_steps[label] = self.compile_nodes(self.blocks[label][1])
+            finally:
+                self.compiling.discard(label)
+        delay = _param(action, "delay", _non_negative(float), required=False)
+        return PlanStep(index, action, "run_block", self.ops.op_run_block, (self.block_steps[label],), delay)
+
+
+def compile_workflow(workflow, ops, batch=False):
+    """Compile workflow into a plan whose repeat and run block steps hold their nested steps"""
+    return ActionPlan(_PlanCompiler(workflow, ops, batch).compile())
@@ -1,36 +1,383 @@
-import pyautogui
-import subprocess
+import sys
+import threading
 import time
+import weakref
+from collections import deque
+from .action_plan import compile_action, compile_workflow
+from .cancellation import CancellationToken, RunCancelled
+from .input_backends import create_backend
+from .pacing import Pacer
+from .script_runner import ScriptRunner
+from .shell_session import ShellSession
+from .timing import RunTimer
+from .tracing import Tracer
+
+class RunContext:
+    """Per-run state handed to every operation"""
+
+    def __init__(self, workflow=None, token=None, on_step_finished=None, max_log_lines=1000, clock=None,
+                 on_log=None):
+        self.workflow = workflow
+        self.on_step_finished = on_step_finished
+        self.on_log = on_log
+        self.token = token if token is not None else CancellationToken()
+        self.timer = RunTimer(clock, cancel=self.token)
+        self.log = deque(maxlen=max_log_lines)
+        self.pending_scripts = []
+        self.shell_session = None
+        self.run_id = None
+        self.backend_ns = 0
+        self.pacer = None
+        self.pending_pace = None
+        self.match = None
+
+    def add_log(self, line):
+        """Keep line in the run's log and pass it to on_log; called from script reader threads too"""
+        self.log.append(line)
+        if self.on_log is not None:
+            self.on_log(line)
+
+    def on_script_output(self, job, stream, line):
+        self.add_log(f"[{stream}] {line}")
+
+    def wait_for_script(self, job, on_cancel):
+        """Wait for job, running on_cancel (which must end it) if the run is cancelled"""
+        self.token.on_cancel(on_cancel)
+        try:
+            job.wait()
+        finally:
+            self.token.remove_callback(on_cancel)
+        self.token.raise_if_cancelled()
+
+    def join_scripts(self):
+        """Wait for 'join later' scripts, raising the first failure"""
+        pending, self.pending_scripts = self.pending_scripts, []
+        for job in pending:
+            self.wait_for_script(job, job.kill)
+        for job in pending:
+            job.check()
+
+    def get_shell_session(self):
+        """Return the run's warm shell, starting a new one if the last one died"""
+        if self.shell_session is None or not self.shell_session.alive:
+            self.shell_session = ShellSession()
+        return self.shell_session
+
+    def close(self):
+        if self.shell_session is not None:
+            self.shell_session.close()
+            self.shell_session = None
+
+    def summary(self):
+        return self.timer.summary()
+
+TEXT_CHUNK_CHARS = 64
+PASTE_SETTLE_SECONDS = 0.2
 
 class AutomationService:
-    def execute_action(self, action):
+    def __init__(self, backend=None, input_lock=None):
+        self.backend = backend if backend is not None else create_backend()
+        self.input_lock = input_lock
+        self.script_runner = ScriptRunner()
+        self._plans = weakref.WeakKeyDictionary()
+        self._plans_lock = threading.Lock()
+        self._references = None
+        self._screen = None
+        self.clock = None
+        self.tracer = Tracer()
+
+    def op_inject(self, context, events):
+        start_ns = time.perf_counter_ns()
+        try:
+            self.backend.execute_batch(events)
+        finally:
+            context.backend_ns += time.perf_counter_ns() - start_ns
+
+    def op_inject_at_match(self, context, build, dx, dy):
+        if context.match is None:
+            raise RuntimeError("No image has been matched yet in this run")
+        x, y = context.match
+        self.op_inject(context, build(x + dx, y + dy))
+
+    def op_text(self, context, text, mode):
+        """Type text in chunks (checking for cancellation in between) or paste it"""
+        if mode == "paste":
+            self.paste_text(context, text)
+            return
+        for start in range(0, len(text), TEXT_CHUNK_CHARS):
+            context.token.raise_if_cancelled()
+            self.op_inject(context, [("type_text", (text[start:start + TEXT_CHUNK_CHARS],))])
+
+    def paste_text(self, context, text):
+        """Paste text through the clipboard, then put the previous clipboard text back"""
+        from . import clipboard
+        original = clipboard.get_text()
+        clipboard.set_text(text)
+        try:
+            modifier = "command" if sys.platform == "darwin" else "ctrl"
+            self.op_inject(context, [("key_down", (modifier,)), ("press", ("v",)), ("key_up", (modifier,))])
+            # The target application reads the clipboard when it handles the paste, so let it
+            clock = context.timer.clock
+            clock.sleep_until(clock.now_ns() + int(PASTE_SETTLE_SECONDS * 1e9), context.token)
+        finally:
+            clipboard.set_text(original)
+        context.token.raise_if_cancelled()
+
+    def op_hold(self, context, x, y, duration):
+        start_ns = time.perf_counter_ns()
+        self.backend.mouse_down(x, y)
+        context.backend_ns += time.perf_counter_ns() - start_ns
+        try:
+            context.timer.wait(duration)
+        finally:
+            start_ns = time.perf_counter_ns()
+            self.backend.mouse_up()
+            context.backend_ns += time.perf_counter_ns() - start_ns
+
+    def op_script(self, context, command, mode, timeout, isolated):
+        use_session = (
+            mode == "wait" and not isolated
+            and context.workflow is not None and context.workflow.persistent_shell
+            and ShellSession.supported()
+        )
+        if use_session:
+            session = context.get_shell_session()
+            context.token.on_cancel(session.close)
+            try:
+                job = session.run(command, timeout, context.on_script_output)
+            finally:
+                context.token.remove_callback(session.close)
+            context.token.raise_if_cancelled()
+            job.check()
+            return
+
+        job = self.script_runner.submit(command, timeout, context.on_script_output, detached=mode != "wait")
+        if mode == "wait":
+            context.wait_for_script(job, job.kill)
+            job.check()
+            return
+        # Stopping the run also stops the scripts it left running
+        context.token.on_cancel(job.kill)
+        if mode == "join later":
+            context.pending_scripts.append(job)
+
+    def op_wait(self, context, seconds):
+        context.timer.wait(seconds)
+
+    def poll(self, context, interval, timeout, check):
+        """Call check() every interval seconds until it returns True; False if timeout passed first"""
+        clock = context.timer.clock
+        start_ns = clock.now_ns()
+        deadline_ns = start_ns + int(timeout * 1e9)
+        interval_ns = max(1, int(interval * 1e9))
+        polls = 0
+        while True:
+            if check():
+                return True
+            polls += 1
+            # Poll at a fixed rate regardless of how long check took
+            next_poll_ns = start_ns + polls * interval_ns
+            if next_poll_ns > deadline_ns:
+                return False
+            if not clock.sleep_until(next_poll_ns, context.token):
+                context.token.raise_if_cancelled()
+
+    def op_wait_image(self, context, image, region, timeout, interval, threshold):
+        """Poll region (or the whole screen) until image appears; its centre becomes context.match"""
+        from .image_matching import ReferenceCache, find_template
+        with self._plans_lock:
+            if self._references is None:
+                self._references = ReferenceCache()
+        reference = self._references.get(image)
+
+        def check():
+            match = find_template(self.grab_region(region), reference, threshold)
+            if match is None:
+                return False
+            x, y, score = match
+            if region is not None:
+                x, y = x + region[0], y + region[1]
+            context.match = (x, y)
+            context.add_log(f"Matched '{image}' at ({x}, {y}), score {score:.3f}")
+            return True
+
+        if not self.poll(context, interval, timeout, check):
+            raise RuntimeError(f"Image '{image}' did not appear within {timeout:g} seconds")
+
+    def op_wait_change(self, context, region, mode, timeout, interval, tolerance, stable_for):
+        """Poll region until it differs from the first frame ('change') or stops changing ('stable')"""
+        from .image_matching import block_signature, signature_distance
+        clock = context.timer.clock
+        baseline = block_signature(self.grab_region(region))
+        stable_since_ns = clock.now_ns()
+        stable_ns = int(stable_for * 1e9)
+
+        def check():
+            nonlocal baseline, stable_since_ns
+            current = block_signature(self.grab_region(region))
+            changed = signature_distance(baseline, current) > tolerance
+            if mode == "change":
+                return changed
+            now_ns = clock.now_ns()
+            if changed:
+                baseline, stable_since_ns = current, now_ns
+            return now_ns - stable_since_ns >= stable_ns
+
+        if not self.poll(context, interval, timeout, check):
+            what = "change" if mode == "change" else "settle"
+            raise RuntimeError(f"Region {list(region)} did not {what} within {timeout:g} seconds")
+
+    def op_repeat(self, context, body, times, duration):
+        """Run body times times (0 = no limit) or until duration seconds have passed"""
+        clock = context.timer.clock
+        deadline_ns = clock.now_ns() + int(duration * 1e9) if duration else None
+        iteration = 0
+        while not times or iteration < times:
+            context.token.raise_if_cancelled()
+            if deadline_ns is not None and clock.now_ns() >= deadline_ns:
+                break
+            self.run_steps(body, context)
+            iteration += 1
+
+    def op_run_block(self, context, body):
+        self.run_steps(body, context)
+
+    @property
+    def screen(self):
+        """The shared ScreenCapture, created (and NumPy loaded) when something first looks at the screen"""
+        with self._plans_lock:
+            if self._screen is None:
+                from .screen_capture import ScreenCapture
+                self._screen = ScreenCapture()
+            return self._screen
+
+    def close_screen(self):
+        with self._plans_lock:
+            screen, self._screen = self._screen, None
+        if screen is not None:
+            screen.close()
+
+    def grab_region(self, region=None):
+        return self.screen.grab(region)
+
+    def compile(self, workflow):
+        """Return the cached plan for workflow, recompiling only if its actions changed"""
+        # The cached plan keeps the old actions alive, so their ids cannot be reused
+        pacing = workflow.pacing
+        signature = (pacing.mode, pacing.delay) + tuple(id(action) for action in workflow.actions)
+        with self._plans_lock:
+            cached = self._plans.get(workflow)
+            if cached and cached[0] == signature:
+                return cached[1]
+            plan = compile_workflow(workflow, self, batch=self.backend.supports_batch)
+            self._plans[workflow] = (signature, plan)
+            return plan
+
+    def run_step(self, step, context):
+        if step.is_control:
+            # Nested steps report their own failures
+            step.run(context)
+            return
         try:
-            if action.action_type == "click":
-                pyautogui.click(action.params["x"], action.params["y"], clicks=action.params["clicks"])
-            elif action.action_type == "hold":
-                pyautogui.mouseDown(action.params["x"], action.params["y"])
-                time.sleep(action.params["duration"])
-                pyautogui.mouseUp()
-            elif action.action_type == "scroll":
-                pyautogui.click(action.params["x"], action.params["y"])
-                pyautogui.scroll(action.params["amount"], x=action.params["x"], y=action.params["y"])
-            elif action.action_type == "drag":
-                pyautogui.moveTo(action.params["x1"], action.params["y1"])
-                pyautogui.dragTo(action.params["x2"], action.params["y2"], button='left')
-            elif action.action_type == "keyboard":
-                pyautogui.write(action.params["keys"])
-            elif action.action_type == "script":
-                subprocess.run(action.params["command"], shell=True, check=True)
-            elif action.action_type == "wait for":
-                time.sleep(action.params["time"])
-            elif action.action_type == "press key":
-                pyautogui.press(action.params["key"])
-            elif action.action_type == "move mouse to":
-                pyautogui.moveTo(action.params["x"], action.params["y"])
+            if step.uses_input and self.input_lock is not None:
+                if not self.input_lock.acquire(context.token):
+                    context.token.raise_if_cancelled()
+                try:
+                    step.run(context)
+                finally:
+                    self.input_lock.release()
+            else:
+                step.run(context)
+        except RunCancelled:
+            raise
         except Exception as e:
+            raise RuntimeError(f"Action '{step.action_type}' failed: {e}")
+
+    def pace(self, context):
+        """Apply the pacing owed after the previous step; skipped after a run's last step"""
+        step, context.pending_pace = context.pending_pace, None
+        if step is not None and context.pacer is not None:
+            context.pacer.wait_after(step)
+
+    def run_steps(self, steps, context):
+        for step in steps:
+            context.token.raise_if_cancelled()
+            if step.is_control:
+                self.pace(context)
+                self.run_step(step, context)
+                if step.delay is not None:
+                    context.pending_pace = step
+            else:
+                self.run_traced_step(step, context)
+
+    def run_traced_step(self, step, context):
+        """Run one step after the pacing owed by the one before it, recording its timings"""
+        pace_start_ns = time.perf_counter_ns()
+        start_ns = end_ns = None
+        outcome = "ok"
+        try:
+            self.pace(context)
+            backend_before = context.backend_ns
+            sleep_before = context.timer.actual_ns
+            start_ns = time.perf_counter_ns()
+            self.run_step(step, context)
+            end_ns = time.perf_counter_ns()
+            context.pending_pace = step
+            if context.on_step_finished is not None:
+                last = getattr(step, "steps", [step])[-1]
+                context.on_step_finished(step, last.index + 1, len(context.workflow.actions))
+        except RunCancelled:
+            outcome = "cancelled"
+            raise
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            if start_ns is None:
+                start_ns = time.perf_counter_ns()
+                backend_before = context.backend_ns
+                sleep_before = context.timer.actual_ns
+            if end_ns is None:
+                end_ns = time.perf_counter_ns()
+            self.tracer.record(
+                context.workflow.name, context.run_id, step, outcome, start_ns, end_ns,
+                context.backend_ns - backend_before, context.timer.actual_ns - sleep_before,
+                start_ns - pace_start_ns
+            )
+
+    def execute_action(self, action):
+        try:
+            step = compile_action(action, self)
+        except ValueError as e:
             raise RuntimeError(f"Action '{action.action_type}' failed: {e}")
+        context = RunContext(clock=self.clock)
+        self.run_step(step, context)
+        context.join_scripts()
 
-    def execute_workflow(self, workflow):
-        for action in workflow.actions:
-            self.execute_action(action)
-            time.sleep(0.5)
\ No newline at end of file
+    def execute_workflow(self, workflow, token=None, on_step_finished=None, on_log=None):
+        """Run every step of workflow and return its RunContext with the timing summary
+
+        Cancelling token stops the run between steps or inside any wait, hold or
+        script wait, raising RunCancelled. on_step_finished(step, done, total) is
+        called from the running thread after each plan step, with done the number
+        of the last action it covered (it goes back inside repeats) and total the
+        number of actions. on_log(line) gets each line of script output and
+        each image match, possibly from a script's reader thread.
+        """
+        plan = self.compile(workflow)
+        context = RunContext(workflow, token, on_step_finished, clock=self.clock, on_log=on_log)
+        context.run_id = self.tracer.next_run_id()
+        context.pacer = Pacer(workflow.pacing, self.grab_region, sleep=context.timer.wait, clock=context.timer.clock)
+        run_start_ns = time.perf_counter_ns()
+        try:
+            self.run_steps(plan, context)
+            try:
+                context.join_scripts()
+            except RunCancelled:
+                raise
+            except Exception as e:
+                raise RuntimeError(f"Action 'script' failed: {e}")
+        finally:
+            context.close()
+            self.tracer.record_run(workflow.name, time.perf_counter_ns() - run_start_ns)
+        return context
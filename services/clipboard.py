@@ -0,0 +1,14 @@
+import pyperclip
+
+def get_text():
+    """Current clipboard text ('' if it is empty or holds something other than text)"""
+    try:
+        return pyperclip.paste()
+    except pyperclip.PyperclipException as e:
+        raise RuntimeError(f"Cannot read the clipboard: {e}")
+
+def set_text(text):
+    try:
+        pyperclip.copy(text)
+    except pyperclip.PyperclipException as e:
+        raise RuntimeError(f"Cannot write the clipboard: {e}")
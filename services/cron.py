@@ -0,0 +1,144 @@
+import calendar
+import functools
+from datetime import datetime, timedelta
+
+MONTH_NAMES = {name.lower(): i for i, name in enumerate(calendar.month_abbr) if name}
+DAY_NAMES = {"sun": 0, "mon": 1, "tue": 2, "wed": 3, "thu": 4, "fri": 5, "sat": 6}
+MACROS = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+# Years to search before deciding an expression never fires (e.g. 30 February)
+SEARCH_YEARS = 8
+
+def _next_bit(mask, start):
+    """Lowest set bit of mask at or above start, or None"""
+    rest = mask >> start
+    if not rest:
+        return None
+    return start + (rest & -rest).bit_length() - 1
+
+def _parse_field(text, low, high, names=None):
+    """Parse one cron field into a bitset with bit n set when n matches"""
+    mask = 0
+    for part in text.lower().split(","):
+        value, _, step = part.partition("/")
+        step = int(step) if step else 1
+        if step < 1:
+            raise ValueError(f"Bad step in '{part}'")
+        if value == "*":
+            start, end = low, high
+        else:
+            first, _, last = value.partition("-")
+            start = _parse_value(first, names)
+            end = _parse_value(last, names) if last else (high if step > 1 else start)
+        if not (low <= start <= high and low <= end <= high) or start > end:
+            raise ValueError(f"'{part}' is outside {low}-{high}")
+        for n in range(start, end + 1, step):
+            mask |= 1 << n
+    return mask
+
+def _parse_value(text, names):
+    if names and text in names:
+        return names[text]
+    try:
+        return int(text)
+    except ValueError:
+        raise ValueError(f"'{text}' is not a number{' or name' if names else ''}")
+
+
+class CronExpression:
+    """A five-field cron expression (minute hour day-of-month month day-of-week)
+
+    Each field is parsed once into a bitset, so next_after() jumps straight
+    to the next matching month, day, hour and minute instead of scanning.
+    Supports *, lists, ranges, steps, month and day names, the @daily style
+    macros and L (last day of the month) in the day-of-month field. As in
+    standard cron, when both day fields are restricted a day matching either
+    one fires. Day-of-week 7 is Sunday, like 0.
+    """
+
+    def __init__(self, expression):
+        self.expression = expression.strip()
+        fields = MACROS.get(self.expression.lower(), self.expression).split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression '{expression}' needs 5 fields, got {len(fields)}")
+        minute, hour, dom, month, dow = fields
+        try:
+            self.minutes = _parse_field(minute, 0, 59)
+            self.hours = _parse_field(hour, 0, 23)
+            self.last_day = "l" in dom.lower().split(",")
+            dom_rest = ",".join(part for part in dom.lower().split(",") if part != "l")
+            self.days = _parse_field(dom_rest, 1, 31) if dom_rest else 0
+            self.months = _parse_field(month, 1, 12, MONTH_NAMES)
+            weekdays = _parse_field(dow, 0, 7, DAY_NAMES)
+        except ValueError as e:
+            raise ValueError(f"Cron expression '{expression}': {e}")
+        self.weekdays = (weekdays | weekdays >> 7) & 0x7F
+        self.any_day = dom.startswith("*")
+        self.any_weekday = dow.startswith("*")
+
+    def __repr__(self):
+        return f"CronExpression({self.expression!r})"
+
+    def days_in(self, year, month):
+        """Bitset of the days of month that match, with bit d set for day d"""
+        length = calendar.monthrange(year, month)[1]
+        dom = self.days | (1 << length if self.last_day else 0)
+        # Weekday (0 = Sunday) of the 1st, then the weekday pattern rotated to start there
+        first = (calendar.weekday(year, month, 1) + 1) % 7
+        week = ((self.weekdays >> first) | (self.weekdays << (7 - first))) & 0x7F
+        dow = 0
+        for offset in range(0, 35, 7):
+            dow |= week << offset
+        dow <<= 1
+        if self.any_day and self.any_weekday:
+            days = dom
+        elif self.any_day:
+            days = dow
+        elif self.any_weekday:
+            days = dom
+        else:
+            days = dom | dow
+        return days & ((1 << (length + 1)) - 2)
+
+    def next_after(self, when):
+        """First matching minute strictly after datetime when, or None if there is none"""
+        when = when.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        year, month, day, hour, minute = when.year, when.month, when.day, when.hour, when.minute
+        while year <= when.year + SEARCH_YEARS:
+            next_month = _next_bit(self.months, month)
+            if next_month is None:
+                year, month, day, hour, minute = year + 1, 1, 1, 0, 0
+                continue
+            if next_month != month:
+                month, day, hour, minute = next_month, 1, 0, 0
+            next_day = _next_bit(self.days_in(year, month), day)
+            if next_day is None:
+                year, month, day, hour, minute = (year + 1, 1, 1, 0, 0) if month == 12 else (year, month + 1, 1, 0, 0)
+                continue
+            if next_day != day:
+                day, hour, minute = next_day, 0, 0
+            next_hour = _next_bit(self.hours, hour)
+            if next_hour is None:
+                day, hour, minute = day + 1, 0, 0
+                continue
+            if next_hour != hour:
+                hour, minute = next_hour, 0
+            next_minute = _next_bit(self.minutes, minute)
+            if next_minute is None:
+                hour, minute = hour + 1, 0
+                continue
+            return datetime(year, month, day, hour, next_minute)
+        return None
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_cron(expression):
+    """Parse expression, sharing one CronExpression between identical schedules"""
+    return CronExpression(expression)
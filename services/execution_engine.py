@@ -0,0 +1,243 @@
+import queue
+import threading
+import time
+from .automation_service import AutomationService
+from .cancellation import CancellationToken, RunCancelled
+from .input_backends import create_backend
+
+class FairLock:
+    """Ticket lock: threads get the input device in the order they asked for it"""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._next_ticket = 0
+        self._serving = 0
+        self._abandoned = set()
+        self.acquisitions = 0
+        self.total_wait_ns = 0
+        self.max_wait_ns = 0
+
+    @property
+    def waiting(self):
+        with self._condition:
+            return max(0, self._next_ticket - self._serving - len(self._abandoned) - 1)
+
+    def acquire(self, cancel=None):
+        """Wait for our turn; returns False if cancel was set first"""
+        start_ns = time.perf_counter_ns()
+        with self._condition:
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            while ticket != self._serving:
+                if cancel is not None and cancel.is_set():
+                    self._abandoned.add(ticket)
+                    return False
+                self._condition.wait(0.005 if cancel is not None else None)
+            wait_ns = time.perf_counter_ns() - start_ns
+            self.acquisitions += 1
+            self.total_wait_ns += wait_ns
+            self.max_wait_ns = max(self.max_wait_ns, wait_ns)
+            return True
+
+    def release(self):
+        with self._condition:
+            self._serving += 1
+            # Skip tickets whose owners gave up while queued
+            while self._serving in self._abandoned:
+                self._abandoned.remove(self._serving)
+                self._serving += 1
+            self._condition.notify_all()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+class RunRequest:
+    def __init__(self, workflow, on_finished=None, token=None, on_step_finished=None, key=None, on_log=None):
+        self.workflow = workflow
+        # What the run was started for (a schedule key such as the workflow's file path), for cancel_workflow
+        self.key = key
+        self.on_finished = on_finished
+        self.on_step_finished = on_step_finished
+        self.on_log = on_log
+        self.token = token if token is not None else CancellationToken()
+        self.submitted_ns = time.perf_counter_ns()
+        self.started_ns = None
+        self.finished_ns = None
+        self.context = None
+        self.error = None
+        self.done = threading.Event()
+
+    @property
+    def queue_wait_ms(self):
+        if self.started_ns is None:
+            return (time.perf_counter_ns() - self.submitted_ns) / 1e6
+        return (self.started_ns - self.submitted_ns) / 1e6
+
+    def cancel(self, reason="Workflow cancelled"):
+        self.token.cancel(reason)
+
+    def wait(self, timeout=None):
+        return self.done.wait(timeout)
+
+    def result(self, timeout=None):
+        """Wait for the run and return its RunContext, re-raising its error"""
+        if not self.done.wait(timeout):
+            raise TimeoutError(f"Workflow '{self.workflow.name}' is still running")
+        if self.error is not None:
+            raise self.error
+        return self.context
+
+
+class ExecutionEngine:
+    """Process-wide run queue whose workers share one input device behind a FairLock"""
+
+    def __init__(self, backend=None, workers=4, max_queue=64):
+        self.input_lock = FairLock()
+        self.service = AutomationService(backend, input_lock=self.input_lock)
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.stats_lock = threading.Lock()
+        self.active_runs = 0
+        self.completed_runs = 0
+        self.failed_runs = 0
+        self.cancelled_runs = 0
+        self.total_queue_wait_ns = 0
+        self.max_queue_wait_ns = 0
+        self.requests = set()
+        self.accepting = True
+        self.workers = []
+        for i in range(workers):
+            worker = threading.Thread(target=self._work, name=f"clicky-run-{i}", daemon=True)
+            worker.start()
+            self.workers.append(worker)
+
+    def submit(self, workflow, on_finished=None, block=True, timeout=None, token=None, on_step_finished=None,
+               key=None, on_log=None):
+        """Queue a run; raises queue.Full if the queue stays full (only when block is False or timeout is set)"""
+        if not self.accepting:
+            raise RuntimeError("The execution engine has been shut down")
+        request = RunRequest(workflow, on_finished, token, on_step_finished, key, on_log)
+        with self.stats_lock:
+            self.requests.add(request)
+        try:
+            self.queue.put(request, block, timeout)
+        except queue.Full:
+            with self.stats_lock:
+                self.requests.discard(request)
+            raise
+        return request
+
+    def cancel_workflow(self, key, reason="Workflow stopped"):
+        """Cancel every queued or running run submitted with key
+
+        Scheduled runs load a fresh Workflow each time, so runs are matched by
+        key rather than by workflow object.
+        """
+        with self.stats_lock:
+            requests = [request for request in self.requests if request.key == key]
+        for request in requests:
+            request.cancel(reason)
+
+    def cancel_all(self, reason="Application exiting"):
+        with self.stats_lock:
+            requests = list(self.requests)
+        for request in requests:
+            request.cancel(reason)
+
+    def _work(self):
+        while True:
+            request = self.queue.get()
+            if request is None:
+                return
+            request.started_ns = time.perf_counter_ns()
+            queue_wait_ns = request.started_ns - request.submitted_ns
+            with self.stats_lock:
+                self.active_runs += 1
+                self.total_queue_wait_ns += queue_wait_ns
+                self.max_queue_wait_ns = max(self.max_queue_wait_ns, queue_wait_ns)
+            try:
+                request.token.raise_if_cancelled()
+                request.context = self.service.execute_workflow(
+                    request.workflow, request.token, request.on_step_finished, request.on_log
+                )
+            except Exception as e:
+                request.error = e
+            request.finished_ns = time.perf_counter_ns()
+            with self.stats_lock:
+                self.requests.discard(request)
+                self.active_runs -= 1
+                self.completed_runs += 1
+                if isinstance(request.error, RunCancelled):
+                    self.cancelled_runs += 1
+                elif request.error is not None:
+                    self.failed_runs += 1
+            request.done.set()
+            if request.on_finished is not None:
+                try:
+                    request.on_finished(request)
+                except Exception as e:
+                    print(f"Run callback for '{request.workflow.name}' failed: {e}")
+
+    def stats(self):
+        with self.stats_lock:
+            started = self.completed_runs + self.active_runs
+            return {
+                "queue_depth": self.queue.qsize(),
+                "queue_capacity": self.queue.maxsize,
+                "active_runs": self.active_runs,
+                "completed_runs": self.completed_runs,
+                "failed_runs": self.failed_runs,
+                "cancelled_runs": self.cancelled_runs,
+                "avg_queue_wait_ms": self.total_queue_wait_ns / started / 1e6 if started else 0.0,
+                "max_queue_wait_ms": self.max_queue_wait_ns / 1e6,
+                "input_waiters": self.input_lock.waiting,
+                "avg_input_wait_ms": (
+                    self.input_lock.total_wait_ns / self.input_lock.acquisitions / 1e6
+                    if self.input_lock.acquisitions else 0.0
+                ),
+                "max_input_wait_ms": self.input_lock.max_wait_ns / 1e6,
+            }
+
+    def shutdown(self, timeout=1.0):
+        """Cancel everything and give running workflows timeout seconds to release their input"""
+        self.accepting = False
+        self.cancel_all()
+        for _ in self.workers:
+            try:
+                self.queue.put(None, timeout=timeout)
+            except queue.Full:
+                break
+        deadline = time.monotonic() + timeout
+        for worker in self.workers:
+            worker.join(max(0, deadline - time.monotonic()))
+        self.service.script_runner.shutdown()
+        self.service.close_screen()
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+def shutdown_engine():
+    """Shut the process-wide engine down if it was ever started"""
+    global _engine
+    with _engine_lock:
+        engine, _engine = _engine, None
+    if engine is not None:
+        engine.shutdown()
+
+def get_engine(backend_name="pyautogui"):
+    """Return the process-wide engine, creating it with backend_name on first use"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            try:
+                backend = create_backend(backend_name)
+            except Exception as e:
+                print(f"Could not initialise '{backend_name}' input backend, using pyautogui: {e}")
+                backend = create_backend("pyautogui")
+            _engine = ExecutionEngine(backend)
+        return _engine
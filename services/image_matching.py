@@ -0,0 +1,187 @@
+import os
+import threading
+import numpy as np
+
+MIN_TEMPLATE_SIDE = 8
+MAX_PYRAMID_LEVELS = 4
+CANDIDATES = 3
+REFINE_RADIUS = 2
+
+def to_gray(image):
+    """Convert a PIL image or an HxW / HxWxC array to a float32 grayscale array"""
+    if not isinstance(image, np.ndarray):
+        return np.asarray(image.convert("L"), dtype=np.float32)
+    if image.ndim == 2:
+        return image.astype(np.float32, copy=False)
+    # RGB(A) or BGR(A): an unweighted mean of the first three channels is order-independent
+    return image[:, :, :3].mean(axis=2, dtype=np.float32)
+
+
+def downsample(gray):
+    """Halve an image by averaging 2x2 blocks (odd edges are dropped)"""
+    h, w = gray.shape[0] // 2 * 2, gray.shape[1] // 2 * 2
+    return gray[:h, :w].reshape(h // 2, 2, w // 2, 2).mean(axis=(1, 3))
+
+
+def block_signature(image, grid=16):
+    """Mean brightness of a grid x grid layout of blocks, cheap to compare between frames"""
+    gray = to_gray(image)
+    rows = min(grid, gray.shape[0])
+    cols = min(grid, gray.shape[1])
+    h, w = gray.shape[0] // rows * rows, gray.shape[1] // cols * cols
+    return gray[:h, :w].reshape(rows, h // rows, cols, w // cols).mean(axis=(1, 3))
+
+
+def signature_distance(a, b):
+    """Mean absolute difference of two block signatures, from 0 (same) to 1"""
+    if a.shape != b.shape:
+        return 1.0
+    return float(np.abs(a - b).mean()) / 255
+
+
+def build_pyramid(gray, levels):
+    pyramid = [gray]
+    for _ in range(levels - 1):
+        pyramid.append(downsample(pyramid[-1]))
+    return pyramid
+
+
+def _window_sums(gray, h, w):
+    """Sum and sum of squares of every h x w window, via integral images"""
+    def integral(values):
+        padded = np.zeros((values.shape[0] + 1, values.shape[1] + 1), dtype=np.float64)
+        np.cumsum(np.cumsum(values, axis=0, dtype=np.float64), axis=1, out=padded[1:, 1:])
+        return padded[h:, w:] - padded[:-h, w:] - padded[h:, :-w] + padded[:-h, :-w]
+    return integral(gray), integral(np.square(gray, dtype=np.float64))
+
+
+def ncc_map(gray, template):
+    """Normalised cross-correlation of template at every position where it fits inside gray
+
+    Scores are in [-1, 1]. A flat (single colour) template has no variance to
+    correlate, so it is scored by how closely each window matches its colour instead.
+    """
+    h, w = template.shape
+    H, W = gray.shape
+    if h > H or w > W:
+        return np.empty((0, 0), dtype=np.float32)
+    n = h * w
+    sums, squares = _window_sums(gray, h, w)
+    window_var = np.maximum(squares - sums * sums / n, 0)
+
+    t = template.astype(np.float64) - template.mean()
+    t_norm = np.sqrt((t * t).sum())
+    if t_norm < 1e-6:
+        mean_error = np.abs(sums / n - template.mean())
+        return (1 - (mean_error + np.sqrt(window_var / n)) / 255).astype(np.float32)
+
+    # Correlate through the FFT; entries from [h-1, w-1] on have no wrap-around
+    spectrum = np.fft.rfft2(gray, s=(H, W)) * np.fft.rfft2(t[::-1, ::-1], s=(H, W))
+    numerator = np.fft.irfft2(spectrum, s=(H, W))[h - 1:, w - 1:]
+    denominator = np.sqrt(window_var) * t_norm
+    scores = np.zeros_like(numerator)
+    valid = denominator > 1e-6
+    scores[valid] = numerator[valid] / denominator[valid]
+    return np.clip(scores, -1, 1).astype(np.float32)
+
+
+def _top_candidates(scores, count, h, w):
+    """Highest-scoring positions, at least half a template apart"""
+    scores = scores.copy()
+    candidates = []
+    for _ in range(count):
+        y, x = np.unravel_index(np.argmax(scores), scores.shape)
+        if not np.isfinite(scores[y, x]):
+            break
+        candidates.append((int(y), int(x)))
+        scores[max(0, y - h // 2):y + h // 2 + 1, max(0, x - w // 2):x + w // 2 + 1] = -np.inf
+    return candidates
+
+
+class Reference:
+    """A reference image with its pyramid, prepared once and reused for every poll"""
+
+    def __init__(self, gray):
+        self.height, self.width = gray.shape
+        levels = 1
+        while (levels < MAX_PYRAMID_LEVELS
+               and min(self.height, self.width) >> levels >= MIN_TEMPLATE_SIDE):
+            levels += 1
+        self.pyramid = build_pyramid(gray, levels)
+
+    @classmethod
+    def load(cls, path):
+        from PIL import Image
+        with Image.open(path) as image:
+            return cls(to_gray(image))
+
+
+class ReferenceCache:
+    """Reference images keyed by path, reloaded only when the file changes"""
+
+    def __init__(self, max_entries=32):
+        self.max_entries = max_entries
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def get(self, path):
+        path = os.path.abspath(path)
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError as e:
+            raise ValueError(f"Cannot read reference image '{path}': {e}")
+        with self.lock:
+            cached = self.entries.get(path)
+            if cached and cached[0] == mtime_ns:
+                return cached[1]
+        reference = Reference.load(path)
+        with self.lock:
+            if len(self.entries) >= self.max_entries:
+                self.entries.pop(next(iter(self.entries)))
+            self.entries[path] = (mtime_ns, reference)
+        return reference
+
+
+def find_template(image, reference, threshold=0.9):
+    """Locate reference in image (PIL image or array), coarse to fine
+
+    Returns (x, y, score) with x, y the centre of the best match in image
+    coordinates, or None if no position scores at least threshold.
+    """
+    gray = to_gray(image)
+    levels = min(len(reference.pyramid), 1 + int(np.log2(max(1, min(gray.shape) // MIN_TEMPLATE_SIDE))))
+    image_pyramid = build_pyramid(gray, levels)
+
+    # Full search only at the coarsest level, where it is cheap
+    top = levels - 1
+    template = reference.pyramid[top]
+    scores = ncc_map(image_pyramid[top], template)
+    if scores.size == 0:
+        return None
+    candidates = _top_candidates(scores, CANDIDATES, *template.shape)
+
+    best = None
+    for y, x in candidates:
+        score = float(scores[y, x])
+        for level in range(top - 1, -1, -1):
+            # Re-search a small neighbourhood around the scaled-up position
+            template = reference.pyramid[level]
+            h, w = template.shape
+            level_image = image_pyramid[level]
+            y0 = max(0, y * 2 - REFINE_RADIUS)
+            x0 = max(0, x * 2 - REFINE_RADIUS)
+            y1 = min(level_image.shape[0], y * 2 + REFINE_RADIUS + h)
+            x1 = min(level_image.shape[1], x * 2 + REFINE_RADIUS + w)
+            local = ncc_map(level_image[y0:y1, x0:x1], template)
+            if local.size == 0:
+                score = -1.0
+                break
+            dy, dx = np.unravel_index(np.argmax(local), local.shape)
+            y, x, score = y0 + int(dy), x0 + int(dx), float(local[dy, dx])
+        if best is None or score > best[2]:
+            best = (x, y, score)
+
+    if best is None or best[2] < threshold:
+        return None
+    x, y, score = best
+    return x + reference.width // 2, y + reference.height // 2, score
@@ -0,0 +1,472 @@
+import importlib.util
+import os
+import sys
+import threading
+import time
+
+KEY_ALIASES = {
+    "return": "enter",
+    "escape": "esc",
+    "del": "delete",
+    "pgup": "pageup",
+    "pgdn": "pagedown",
+    "control": "ctrl",
+    "option": "alt",
+    "super": "win",
+    "cmd": "win",
+    "command": "win",
+    " ": "space",
+}
+
+def normalize_key(key):
+    """Map a key name to the pyautogui-style name used by all backends"""
+    if len(key) == 1:
+        return KEY_ALIASES.get(key, key)
+    key = key.lower()
+    return KEY_ALIASES.get(key, key)
+
+
+class InputBackend:
+    """Common interface for mouse and keyboard injection"""
+
+    name = None
+    supports_batch = False
+    # Backends that inject nothing, for benchmarks and tests; not offered in Settings
+    for_testing = False
+    # Modules the backend imports when it is created
+    requires = ()
+
+    @classmethod
+    def available(cls):
+        """Whether the backend can likely start here, checked without creating it"""
+        return all(importlib.util.find_spec(module) is not None for module in cls.requires)
+
+    def execute_batch(self, events):
+        """Inject a sequence of (method name, args) events in order"""
+        for method, args in events:
+            getattr(self, method)(*args)
+
+    def move_to(self, x, y):
+        raise NotImplementedError
+
+    def click(self, x, y, clicks=1, button="left"):
+        raise NotImplementedError
+
+    def mouse_down(self, x, y, button="left"):
+        raise NotImplementedError
+
+    def mouse_up(self, button="left"):
+        raise NotImplementedError
+
+    def scroll(self, amount, x, y):
+        raise NotImplementedError
+
+    def drag_to(self, x, y, button="left"):
+        self.mouse_down(None, None, button)
+        self.move_to(x, y)
+        self.mouse_up(button)
+
+    def write(self, text):
+        for char in text:
+            self.press(char)
+
+    def type_text(self, text):
+        """Type arbitrary Unicode text as fast as the backend allows"""
+        self.write(text)
+
+    def press(self, key):
+        self.key_down(key)
+        self.key_up(key)
+
+    def key_down(self, key):
+        raise NotImplementedError
+
+    def key_up(self, key):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class PyAutoGUIBackend(InputBackend):
+    name = "pyautogui"
+    supports_batch = True
+    requires = ("pyautogui",)
+
+    def __init__(self, pause=True):
+        import pyautogui
+        self.gui = pyautogui
+        self.pause = pause
+        self._typist = None
+
+    def execute_batch(self, events):
+        # One PAUSE for the whole batch instead of one per call
+        pause = self.pause
+        self.pause = False
+        try:
+            InputBackend.execute_batch(self, events)
+        finally:
+            self.pause = pause
+        if pause and self.gui.PAUSE:
+            time.sleep(self.gui.PAUSE)
+
+    def move_to(self, x, y):
+        self.gui.moveTo(x, y, _pause=self.pause)
+
+    def click(self, x, y, clicks=1, button="left"):
+        self.gui.click(x, y, clicks=clicks, button=button, _pause=self.pause)
+
+    def mouse_down(self, x, y, button="left"):
+        self.gui.mouseDown(x, y, button=button, _pause=self.pause)
+
+    def mouse_up(self, button="left"):
+        self.gui.mouseUp(button=button, _pause=self.pause)
+
+    def scroll(self, amount, x, y):
+        self.gui.scroll(amount, x=x, y=y, _pause=self.pause)
+
+    def drag_to(self, x, y, button="left"):
+        self.gui.dragTo(x, y, button=button, _pause=self.pause)
+
+    def write(self, text):
+        self.gui.write(text, _pause=self.pause)
+
+    def type_text(self, text):
+        # pyautogui.write skips characters that are not on the keyboard; pynput types any Unicode
+        if self._typist is None:
+            try:
+                from pynput import keyboard
+                self._typist = keyboard.Controller()
+            except Exception:
+                self._typist = False
+        if self._typist:
+            self._typist.type(text)
+        else:
+            self.gui.write(text, _pause=False)
+
+    def press(self, key):
+        self.gui.press(key, _pause=self.pause)
+
+    def key_down(self, key):
+        self.gui.keyDown(key, _pause=self.pause)
+
+    def key_up(self, key):
+        self.gui.keyUp(key, _pause=self.pause)
+
+
+class PynputBackend(InputBackend):
+    name = "pynput"
+    requires = ("pynput",)
+
+    KEY_NAMES = {
+        "enter": "enter", "esc": "esc", "tab": "tab", "backspace": "backspace",
+        "delete": "delete", "space": "space", "up": "up", "down": "down",
+        "left": "left", "right": "right", "home": "home", "end": "end",
+        "pageup": "page_up", "pagedown": "page_down", "insert": "insert",
+        "capslock": "caps_lock", "ctrl": "ctrl", "shift": "shift", "alt": "alt",
+        "win": "cmd", "menu": "menu", "printscreen": "print_screen",
+    }
+
+    def __init__(self):
+        from pynput import keyboard, mouse
+        self.mouse = mouse.Controller()
+        self.keyboard = keyboard.Controller()
+        self.Key = keyboard.Key
+        self.buttons = {"left": mouse.Button.left, "right": mouse.Button.right, "middle": mouse.Button.middle}
+
+    def _key(self, key):
+        key = normalize_key(key)
+        if len(key) == 1:
+            return key
+        if key in self.KEY_NAMES:
+            return getattr(self.Key, self.KEY_NAMES[key])
+        if key.startswith("f") and key[1:].isdigit():
+            return getattr(self.Key, key)
+        raise ValueError(f"Unsupported key '{key}'")
+
+    def move_to(self, x, y):
+        self.mouse.position = (x, y)
+
+    def click(self, x, y, clicks=1, button="left"):
+        self.mouse.position = (x, y)
+        self.mouse.click(self.buttons[button], clicks)
+
+    def mouse_down(self, x, y, button="left"):
+        if x is not None and y is not None:
+            self.mouse.position = (x, y)
+        self.mouse.press(self.buttons[button])
+
+    def mouse_up(self, button="left"):
+        self.mouse.release(self.buttons[button])
+
+    def scroll(self, amount, x, y):
+        self.mouse.position = (x, y)
+        self.mouse.scroll(0, amount)
+
+    def write(self, text):
+        self.keyboard.type(text)
+
+    def type_text(self, text):
+        self.keyboard.type(text)
+
+    def key_down(self, key):
+        self.keyboard.press(self._key(key))
+
+    def key_up(self, key):
+        self.keyboard.release(self._key(key))
+
+
+class XTestBackend(InputBackend):
+    """Injects events straight into the X server through the XTEST extension"""
+
+    name = "xtest"
+    supports_batch = True
+    requires = ("Xlib",)
+
+    @classmethod
+    def available(cls):
+        return sys.platform.startswith("linux") and bool(os.environ.get("DISPLAY")) and super().available()
+
+    KEYSYM_NAMES = {
+        "enter": "Return", "esc": "Escape", "tab": "Tab", "backspace": "BackSpace",
+        "delete": "Delete", "space": "space", "up": "Up", "down": "Down",
+        "left": "Left", "right": "Right", "home": "Home", "end": "End",
+        "pageup": "Prior", "pagedown": "Next", "insert": "Insert",
+        "capslock": "Caps_Lock", "ctrl": "Control_L", "shift": "Shift_L",
+        "alt": "Alt_L", "win": "Super_L", "menu": "Menu", "printscreen": "Print",
+    }
+    BUTTONS = {"left": 1, "middle": 2, "right": 3}
+    TEXT_KEYS = {"\n": "enter", "\t": "tab"}
+
+    def __init__(self):
+        if not sys.platform.startswith("linux"):
+            raise RuntimeError("The xtest backend is only available on Linux")
+        from Xlib import X, XK, display
+        from Xlib.ext import xtest
+        self.X = X
+        self.XK = XK
+        self.xtest = xtest
+        self.display = display.Display()
+        if not self.display.has_extension("XTEST"):
+            raise RuntimeError("The X server does not support the XTEST extension")
+        self.shift_keycode = self.display.keysym_to_keycode(XK.string_to_keysym("Shift_L"))
+        self._batching = False
+
+    def execute_batch(self, events):
+        # Queue every fake event and flush them to the server with a single round trip
+        self._batching = True
+        try:
+            InputBackend.execute_batch(self, events)
+        finally:
+            self._batching = False
+            self.display.sync()
+
+    def _fake(self, event_type, detail=0, **kwargs):
+        self.xtest.fake_input(self.display, event_type, detail, **kwargs)
+
+    def _sync(self):
+        if not self._batching:
+            self.display.sync()
+
+    def _keysym(self, key):
+        key = normalize_key(key)
+        if len(key) == 1:
+            # Latin-1 keysyms equal their code points, the rest live at 0x01000000 + code point
+            return ord(key) if ord(key) < 0x100 else 0x01000000 + ord(key)
+        if key.startswith("f") and key[1:].isdigit():
+            return self.XK.string_to_keysym(key.upper())
+        keysym = self.XK.string_to_keysym(self.KEYSYM_NAMES.get(key, key))
+        if not keysym:
+            raise ValueError(f"Unsupported key '{key}'")
+        return keysym
+
+    def _keycode(self, key):
+        keysym = self._keysym(key)
+        keycode = self.display.keysym_to_keycode(keysym)
+        if not keycode:
+            raise ValueError(f"Key '{key}' is not mapped on this keyboard")
+        shifted = self.display.keycode_to_keysym(keycode, 0) != keysym
+        return keycode, shifted
+
+    def _move(self, x, y):
+        self._fake(self.X.MotionNotify, x=x, y=y)
+
+    def _button(self, button, pressed):
+        self._fake(self.X.ButtonPress if pressed else self.X.ButtonRelease, self.BUTTONS[button])
+
+    def _key(self, keycode, shifted, pressed):
+        event_type = self.X.KeyPress if pressed else self.X.KeyRelease
+        if shifted and pressed:
+            self._fake(self.X.KeyPress, self.shift_keycode)
+        self._fake(event_type, keycode)
+        if shifted and not pressed:
+            self._fake(self.X.KeyRelease, self.shift_keycode)
+
+    def move_to(self, x, y):
+        self._move(x, y)
+        self._sync()
+
+    def click(self, x, y, clicks=1, button="left"):
+        self._move(x, y)
+        for _ in range(clicks):
+            self._button(button, True)
+            self._button(button, False)
+        self._sync()
+
+    def mouse_down(self, x, y, button="left"):
+        if x is not None and y is not None:
+            self._move(x, y)
+        self._button(button, True)
+        self._sync()
+
+    def mouse_up(self, button="left"):
+        self._button(button, False)
+        self._sync()
+
+    def scroll(self, amount, x, y):
+        self._move(x, y)
+        wheel = 4 if amount > 0 else 5
+        for _ in range(abs(amount)):
+            self._fake(self.X.ButtonPress, wheel)
+            self._fake(self.X.ButtonRelease, wheel)
+        self._sync()
+
+    def drag_to(self, x, y, button="left"):
+        self._button(button, True)
+        self._move(x, y)
+        self._button(button, False)
+        self._sync()
+
+    def write(self, text):
+        for char in text:
+            keycode, shifted = self._keycode(char)
+            self._key(keycode, shifted, True)
+            self._key(keycode, shifted, False)
+        self._sync()
+
+    def type_text(self, text):
+        """Type text, temporarily mapping a spare keycode to characters the layout lacks"""
+        spare = None
+        try:
+            for char in text:
+                char = self.TEXT_KEYS.get(char, char)
+                try:
+                    keycode, shifted = self._keycode(char)
+                except ValueError:
+                    if spare is None:
+                        spare = self._spare_keycode()
+                    self.display.change_keyboard_mapping(spare, [(self._keysym(char),) * 2])
+                    # The remapping has to reach the server before the key event that uses it
+                    self.display.sync()
+                    keycode, shifted = spare, False
+                self._key(keycode, shifted, True)
+                self._key(keycode, shifted, False)
+                if keycode == spare:
+                    self.display.sync()
+        finally:
+            if spare is not None:
+                self.display.change_keyboard_mapping(spare, [(0, 0)])
+            self.display.sync()
+
+    def _spare_keycode(self):
+        first = self.display.display.info.min_keycode
+        count = self.display.display.info.max_keycode - first + 1
+        for offset, keysyms in enumerate(self.display.get_keyboard_mapping(first, count)):
+            if not any(keysyms):
+                return first + offset
+        raise ValueError("No spare keycode to type characters missing from the keyboard layout")
+
+    def press(self, key):
+        keycode, shifted = self._keycode(key)
+        self._key(keycode, shifted, True)
+        self._key(keycode, shifted, False)
+        self._sync()
+
+    def key_down(self, key):
+        keycode, shifted = self._keycode(key)
+        self._key(keycode, shifted, True)
+        self._sync()
+
+    def key_up(self, key):
+        keycode, shifted = self._keycode(key)
+        self._key(keycode, shifted, False)
+        self._sync()
+
+    def close(self):
+        self.display.close()
+
+
+class RecordingBackend(InputBackend):
+    """Records events in memory with perf_counter_ns timestamps instead of injecting them"""
+
+    name = "recording"
+    supports_batch = True
+    for_testing = True
+
+    def __init__(self):
+        self.events = []
+        self.lock = threading.Lock()
+
+    def record(self, event, *args):
+        with self.lock:
+            self.events.append((time.perf_counter_ns(), event, args))
+
+    def execute_batch(self, events):
+        timestamp = time.perf_counter_ns()
+        with self.lock:
+            self.events.extend((timestamp, method, tuple(args)) for method, args in events)
+
+    def clear(self):
+        with self.lock:
+            self.events = []
+
+    def move_to(self, x, y):
+        self.record("move_to", x, y)
+
+    def click(self, x, y, clicks=1, button="left"):
+        self.record("click", x, y, clicks, button)
+
+    def mouse_down(self, x, y, button="left"):
+        self.record("mouse_down", x, y, button)
+
+    def mouse_up(self, button="left"):
+        self.record("mouse_up", button)
+
+    def scroll(self, amount, x, y):
+        self.record("scroll", amount, x, y)
+
+    def drag_to(self, x, y, button="left"):
+        self.record("drag_to", x, y, button)
+
+    def write(self, text):
+        self.record("write", text)
+
+    def type_text(self, text):
+        self.record("type_text", text)
+
+    def press(self, key):
+        self.record("press", key)
+
+    def key_down(self, key):
+        self.record("key_down", key)
+
+    def key_up(self, key):
+        self.record("key_up", key)
+
+
+BACKENDS = {
+    "pyautogui": PyAutoGUIBackend,
+    "pynput": PynputBackend,
+    "xtest": XTestBackend,
+    "recording": RecordingBackend,
+}
+
+def create_backend(name="pyautogui"):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown input backend '{name}'")
+    return BACKENDS[name]()
+
+def available_backends():
+    """Return the names of the backends users can pick that look usable on this machine"""
+    return [name for name, backend_class in BACKENDS.items()
+            if not backend_class.for_testing and backend_class.available()]
@@ -0,0 +1,41 @@
+import time
+import zlib
+from .timing import NS_PER_SECOND, PrecisionClock
+
+class Pacer:
+    """Waits between actions according to a workflow's Pacing settings"""
+
+    def __init__(self, pacing, grab_region=None, sleep=time.sleep, clock=None):
+        self.pacing = pacing
+        self.grab_region = grab_region
+        self.sleep = sleep
+        self.clock = clock if clock is not None else PrecisionClock()
+
+    def wait_after(self, step):
+        if step.delay is not None:
+            self.sleep(step.delay)
+        elif self.pacing.mode == "fast":
+            return
+        elif self.pacing.mode == "adaptive":
+            self.wait_for_settle()
+        else:
+            self.sleep(self.pacing.delay)
+
+    def wait_for_settle(self):
+        """Sleep for the latency floor, then until the settle region stops changing"""
+        pacing = self.pacing
+        deadline_ns = self.clock.now_ns() + int(pacing.settle_timeout * NS_PER_SECOND)
+        self.sleep(pacing.min_delay)
+        if not pacing.settle_region or self.grab_region is None:
+            return
+
+        previous = self._signature()
+        while self.clock.now_ns() < deadline_ns:
+            self.sleep(pacing.settle_interval)
+            current = self._signature()
+            if current == previous:
+                return
+            previous = current
+
+    def _signature(self):
+        return zlib.crc32(self.grab_region(self.pacing.settle_region))
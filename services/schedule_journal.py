@@ -0,0 +1,225 @@
+import json
+import os
+import threading
+import time
+
+class ScheduleJournal:
+    """Append-only log of scheduler events, so counts and pending runs survive a restart
+
+    Each line is one JSON record. Appending only queues the record; a
+    background thread writes and fsyncs the queue in batches (at most
+    sync_interval apart), so a burst of triggers costs one fsync and callers
+    never wait for the disk. Once compact_after records have been appended
+    the thread rewrites the log as a snapshot of the live entries.
+
+    An entry is keyed by the scheduler's workflow key (see
+    SchedulingService.schedule_workflow) and scheduled execution index. It
+    holds the execution's settings (as ScheduledExecution.to_dict() gives
+    them), how many times it has run, the next run time of each of its jobs
+    and when a run last finished (with its error, if it failed). sources maps
+    workflow keys that are file paths to the modification time the file had
+    when it was scheduled, so unchanged files need not be read again.
+
+    A read_only journal is loaded but never written: appends only change the
+    state in memory.
+    """
+
+    def __init__(self, path, sync_interval=0.2, compact_after=1000, read_only=False):
+        self.path = path
+        self.read_only = read_only
+        self.sync_interval = sync_interval
+        self.compact_after = compact_after
+        self.entries = {}
+        self.sources = {}
+        self.records = 0
+        self.pending = []
+        self.appended = 0
+        self.synced = 0
+        self.flush_now = False
+        self.file = None
+        self.thread = None
+        self.closed = False
+        self.condition = threading.Condition()
+        self.load()
+
+    def load(self):
+        """Rebuild entries by replaying the log; a torn last line (from a crash) is dropped"""
+        self.entries = {}
+        self.sources = {}
+        self.records = 0
+        if os.path.exists(self.path):
+            valid_bytes = 0
+            with open(self.path, 'rb') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        print(f"Scheduler journal '{self.path}' ends with a damaged record, ignoring it")
+                        break
+                    self.apply(record)
+                    self.records += 1
+                    valid_bytes += len(line)
+            if self.read_only:
+                return
+            if valid_bytes < os.path.getsize(self.path):
+                with open(self.path, 'r+b') as f:
+                    f.truncate(valid_bytes)
+        if self.read_only:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        self.file = open(self.path, 'a', encoding='utf-8')
+        if self._should_compact():
+            self._compact(self._snapshot())
+
+    def apply(self, record):
+        op = record.get("op")
+        key = (record.get("workflow"), record.get("idx"))
+        if op in ("schedule", "entry"):
+            self.entries[key] = {
+                "execution": record["execution"],
+                "count": record.get("count", 0),
+                "next_runs": list(record["next_runs"]),
+                "last_run": record.get("last_run"),
+                "last_finished": record.get("last_finished"),
+                "last_error": record.get("last_error"),
+            }
+        elif op == "fire" and key in self.entries:
+            entry = self.entries[key]
+            entry["count"] = record["count"]
+            entry["last_run"] = record["at"]
+            if record["slot"] < len(entry["next_runs"]):
+                entry["next_runs"][record["slot"]] = record["next_run"]
+        elif op == "source":
+            self.sources[record["workflow"]] = record["mtime_ns"]
+        elif op == "finish":
+            # A run belongs to the whole workflow, not to one of its scheduled executions
+            for entry_key, entry in self.entries.items():
+                if entry_key[0] == key[0]:
+                    entry["last_finished"] = record["at"]
+                    entry["last_error"] = record.get("error")
+        elif op == "clear":
+            if record.get("idx") is None:
+                # Clearing a whole workflow also forgets its file, so it is read again
+                self.sources.pop(key[0], None)
+                for entry_key in [entry_key for entry_key in self.entries if entry_key[0] == key[0]]:
+                    del self.entries[entry_key]
+            else:
+                self.entries.pop(key, None)
+
+    def append(self, record):
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self.condition:
+            if self.closed:
+                return
+            self.apply(record)
+            if self.read_only:
+                return
+            self.pending.append(line)
+            self.records += 1
+            self.appended += 1
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._sync_loop, name="Scheduler journal", daemon=True)
+                self.thread.start()
+            self.condition.notify()
+
+    def record_schedule(self, workflow, idx, execution, next_runs):
+        self.append({"op": "schedule", "workflow": workflow, "idx": idx, "execution": execution,
+                     "next_runs": next_runs})
+
+    def record_fire(self, workflow, idx, slot, count, next_run):
+        self.append({"op": "fire", "workflow": workflow, "idx": idx, "slot": slot, "count": count,
+                     "next_run": next_run, "at": time.time()})
+
+    def record_finish(self, workflow, error=None):
+        self.append({"op": "finish", "workflow": workflow, "at": time.time(),
+                     "error": str(error) if error is not None else None})
+
+    def record_source(self, workflow, mtime_ns):
+        self.append({"op": "source", "workflow": workflow, "mtime_ns": mtime_ns})
+
+    def record_clear(self, workflow, idx=None):
+        self.append({"op": "clear", "workflow": workflow, "idx": idx})
+
+    def _sync_loop(self):
+        # The only writer once the journal is open; the disk is never touched with the condition held
+        while True:
+            with self.condition:
+                while not self.pending and not self.closed:
+                    self.condition.wait()
+                # Let a burst of records gather so they share one fsync
+                deadline = time.monotonic() + self.sync_interval
+                while not self.closed and not self.flush_now and time.monotonic() < deadline:
+                    self.condition.wait(deadline - time.monotonic())
+                lines, self.pending = self.pending, []
+                target = self.appended
+                self.flush_now = False
+                snapshot = None
+                if self._should_compact():
+                    # The snapshot already includes the records just taken
+                    snapshot = self._snapshot()
+                    self.records = len(snapshot)
+                closed = self.closed
+            try:
+                if snapshot is not None:
+                    self._compact(snapshot)
+                elif lines:
+                    self.file.writelines(lines)
+                    self.file.flush()
+                    os.fsync(self.file.fileno())
+            except OSError as e:
+                print(f"Could not write scheduler journal '{self.path}': {e}")
+            with self.condition:
+                self.synced = target
+                self.condition.notify_all()
+            if closed:
+                self.file.close()
+                return
+
+    def _should_compact(self):
+        return self.records > max(self.compact_after, 2 * (len(self.entries) + len(self.sources)))
+
+    def _snapshot(self):
+        """Copies of the live entries and sources, in the form compaction writes them; called with the condition held"""
+        records = []
+        for (workflow, idx), entry in self.entries.items():
+            record = {"op": "entry", "workflow": workflow, "idx": idx}
+            record.update(entry)
+            record["next_runs"] = list(entry["next_runs"])
+            records.append(record)
+        for workflow, mtime_ns in self.sources.items():
+            records.append({"op": "source", "workflow": workflow, "mtime_ns": mtime_ns})
+        return records
+
+    def _compact(self, records):
+        """Rewrite the log as the given snapshot records"""
+        temp_path = self.path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, separators=(",", ":")) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.file.close()
+        os.replace(temp_path, self.path)
+        self.file = open(self.path, 'a', encoding='utf-8')
+
+    def sync(self):
+        """Wait until everything appended so far is on disk"""
+        with self.condition:
+            target = self.appended
+            self.flush_now = True
+            self.condition.notify_all()
+            while self.synced < target and self.thread is not None and self.thread.is_alive():
+                self.condition.wait()
+
+    def close(self):
+        with self.condition:
+            if self.closed:
+                return
+            self.closed = True
+            thread = self.thread
+            self.condition.notify_all()
+        if thread is not None:
+            thread.join()
+        elif self.file is not None:
+            self.file.close()
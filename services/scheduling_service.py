@@ -1,132 +1,461 @@
-import schedule
-import time
 import threading
+import time
 from datetime import datetime, timedelta
+from .cron import parse_cron
+from .schedule_journal import ScheduleJournal
+from .timer_heap import TimerHeap
+
+DAILY_FORMATS = ("%H:%M:%S", "%H:%M")
+DATETIME_FORMATS = ("%Y-%m-%d %H:%M:%S",)
+
+def parse_start(value):
+    """Return (datetime, None) for a date and time, (None, time) for a daily time of day, or (None, None)"""
+    if isinstance(value, datetime):
+        return value, None
+    if not isinstance(value, str) or not value.strip():
+        return None, None
+    value = value.strip()
+    for fmt in DAILY_FORMATS:
+        try:
+            return None, datetime.strptime(value, fmt).time()
+        except ValueError:
+            pass
+    try:
+        return datetime.fromisoformat(value), None
+    except ValueError:
+        pass
+    for fmt in DATETIME_FORMATS:
+        try:
+            return datetime.strptime(value, fmt), None
+        except ValueError:
+            pass
+    return None, None
+
+def next_daily(at, now):
+    """Timestamp of the next time of day at strictly after timestamp now"""
+    today = datetime.fromtimestamp(now)
+    run = datetime.combine(today.date(), at)
+    if run.timestamp() <= now:
+        run = datetime.combine(today.date() + timedelta(days=1), at)
+    return run.timestamp()
+
+def next_cron(cron, now):
+    """Timestamp of cron's next fire time after timestamp now, or None"""
+    following = cron.next_after(datetime.fromtimestamp(now))
+    return following.timestamp() if following is not None else None
+
+class ScheduledJob:
+    """One trigger of a workflow: at next_run (a timestamp), then every interval seconds,
+    daily at daily_at or whenever cron (a CronExpression) matches
+
+    idx is the scheduled execution the job belongs to and slot its place among
+    that execution's jobs.
+    """
+
+    def __init__(self, name, callback, idx, slot, max_executions, next_run, interval=None, daily_at=None,
+                 misfire_policy="fire_once", catch_up_limit=3, cron=None):
+        self.name = name
+        self.callback = callback
+        self.idx = idx
+        self.slot = slot
+        self.max_executions = max_executions
+        self.next_run = next_run
+        self.interval = interval
+        self.daily_at = daily_at
+        self.misfire_policy = misfire_policy
+        self.catch_up_limit = catch_up_limit
+        self.cron = cron
+
+    def missed_runs(self, now, limit):
+        """How many runs fell due from next_run up to now, counting no further than limit"""
+        if self.cron is not None:
+            missed, run = 0, self.next_run
+            while run is not None and run <= now and missed < limit:
+                missed += 1
+                run = next_cron(self.cron, run)
+            return missed
+        if self.daily_at is not None:
+            return int((now - self.next_run) // 86400) + 1
+        if self.interval:
+            return int((now - self.next_run) // self.interval) + 1
+        return 1
+
+    def misfire_runs(self, now):
+        """How many runs to make now that the one due at next_run was missed"""
+        if self.misfire_policy == "skip":
+            return 0
+        if self.misfire_policy == "catch_up":
+            return max(1, min(self.missed_runs(now, self.catch_up_limit), self.catch_up_limit))
+        return 1
+
+    def following_run(self, now):
+        """When to fire after the run due at next_run, or None for a one-shot job"""
+        if self.cron is not None:
+            return next_cron(self.cron, max(now, self.next_run))
+        if self.daily_at is not None:
+            return next_daily(self.daily_at, max(now, self.next_run))
+        if not self.interval:
+            return None
+        following = self.next_run + self.interval
+        if following <= now:
+            # Fell behind (a slow callback, or the machine slept): skip the missed runs
+            following += ((now - following) // self.interval + 1) * self.interval
+        return following
 
 class SchedulingService:
-    def __init__(self):
+    """Fires scheduled workflows from one thread that sleeps until the earliest deadline
+
+    Jobs sit in a TimerHeap ordered by their next run time. The scheduler
+    thread waits on a condition variable for exactly as long as the earliest
+    job needs, and is woken early whenever a job is added or cancelled.
+
+    Run times are wall-clock timestamps. Waits are capped at max_sleep so a
+    clock change or a suspend/resume is noticed; a job that fires more than
+    misfire_grace seconds late is handled by its misfire policy.
+    """
+
+    def __init__(self, clock=time.time, misfire_grace=1.0, max_sleep=60.0, journal=None):
+        self.clock = clock
+        self.misfire_grace = misfire_grace
+        self.max_sleep = max_sleep
+        # A ScheduleJournal makes counts and pending runs survive restarts (see restore)
+        self.journal = journal
         self.jobs = {}
         self.execution_counts = {}
+        self.heap = TimerHeap()
+        self.condition = threading.Condition()
+        self.thread = None
+        self.running = False
+
+    def schedule_workflow(self, workflow, callback, key=None):
+        """Schedule workflow and return warnings about its repeat intervals (see check_intervals)
 
-    def schedule_workflow(self, workflow, callback):
-        self.clear_jobs_for_workflow(workflow.name)
-        self.jobs[workflow.name] = []
-        self.execution_counts[workflow.name] = {}
-        
+        key identifies the workflow's jobs and journal entries, replacing any
+        scheduled under it before; it defaults to the workflow's name. Pass the
+        file path (or something unique for unsaved workflows) when names may
+        clash. Raises ValueError, before anything is scheduled, if a cron
+        expression is invalid.
+        """
+        name = key if key is not None else workflow.name
         if hasattr(workflow, 'scheduled_executions') and workflow.scheduled_executions:
-            for idx, scheduled_execution in enumerate(workflow.scheduled_executions):
-                self._schedule_execution(workflow, scheduled_execution, callback, idx)
+            executions = [scheduled_execution.to_dict() for scheduled_execution in workflow.scheduled_executions]
         elif workflow.start_time:
-            self._schedule_legacy(workflow, callback)
+            executions = [{
+                "execution_datetime": workflow.start_time,
+                "repeat_interval": workflow.repeat_interval,
+                "execution_count": workflow.execution_count
+            }]
         else:
+            executions = []
+        crons = {idx: parse_cron(execution["cron"])
+                 for idx, execution in enumerate(executions) if execution.get("cron")}
+        warnings = self.check_intervals(workflow, crons)
+        self.clear_jobs_for_workflow(name)
+
+        for idx, execution in enumerate(executions):
+            self._schedule_execution(name, callback, idx, execution, crons.get(idx))
+        if not executions:
             callback()
+        return warnings
+
+    def restore(self, callback_for):
+        """Re-create the jobs recorded in the journal, with their run counts
 
-    def _schedule_execution(self, workflow, scheduled_execution, callback, idx):
-        self.execution_counts[workflow.name][idx] = 0
-        
-        exec_datetime = scheduled_execution.execution_datetime
-        
-        if isinstance(exec_datetime, str):
+        callback_for(key) returns the callback that runs the workflow, or None
+        to drop its jobs from the journal too. Runs that fell due while the
+        app was closed are handled by each execution's misfire policy.
+        Returns how many scheduled executions were restored.
+        """
+        if self.journal is None:
+            return 0
+        restored = 0
+        callbacks = {}
+        for (name, idx), entry in list(self.journal.entries.items()):
+            execution = entry["execution"]
+            max_executions = execution.get("execution_count") or 0
+            if max_executions and entry["count"] >= max_executions:
+                continue
+            if all(next_run is None for next_run in entry["next_runs"]):
+                continue
             try:
-                exec_datetime = datetime.fromisoformat(exec_datetime)
-            except ValueError:
-                try:
-                    exec_datetime = datetime.strptime(exec_datetime, "%Y-%m-%d %H:%M:%S")
-                except ValueError:
-                    self._run_with_count(workflow, callback, idx, scheduled_execution.execution_count)
-                    return
-        
-        if exec_datetime and exec_datetime > datetime.now():
-            time_to_exec = exec_datetime - datetime.now()
-            seconds_to_exec = time_to_exec.total_seconds()
-            
-            job = schedule.every(int(seconds_to_exec)).seconds.do(
-                self._run_with_count, 
-                workflow, 
-                callback, 
-                idx, 
-                scheduled_execution.execution_count
-            )
-            self.jobs[workflow.name].append((job, idx))
-        
-        if scheduled_execution.repeat_interval:
-            job = schedule.every(scheduled_execution.repeat_interval).seconds.do(
-                self._run_with_count, 
-                workflow, 
-                callback, 
-                idx, 
-                scheduled_execution.execution_count
-            )
-            self.jobs[workflow.name].append((job, idx))
-
-    def _schedule_legacy(self, workflow, callback):
-        self.execution_counts[workflow.name][0] = 0
-        
-        try:
-            if " " in workflow.start_time:
-                start_time = datetime.strptime(workflow.start_time, "%Y-%m-%d %H:%M:%S")
-                time_to_exec = start_time - datetime.now()
-                if time_to_exec.total_seconds() > 0:
-                    job = schedule.every(int(time_to_exec.total_seconds())).seconds.do(
-                        self._run_with_count, workflow, callback, 0, workflow.execution_count
-                    )
-                    self.jobs[workflow.name].append((job, 0))
-            else:
-                job = schedule.every().day.at(workflow.start_time).do(
-                    self._run_with_count, workflow, callback, 0, workflow.execution_count
+                cron = parse_cron(execution["cron"]) if execution.get("cron") else None
+            except ValueError as e:
+                print(f"Not restoring schedule {idx + 1} of '{name}': {e}")
+                continue
+            if name not in callbacks:
+                callbacks[name] = callback_for(name)
+                if callbacks[name] is None:
+                    # Its file is gone, or it was never saved; nothing can run it again
+                    self.journal.record_clear(name)
+            callback = callbacks[name]
+            if callback is None:
+                continue
+            self._schedule_execution(name, callback, idx, execution, cron, entry["next_runs"], entry["count"])
+            restored += 1
+        return restored
+
+    def check_intervals(self, workflow, crons=None):
+        """Warn about repeat intervals shorter than the workflow's estimated run time
+
+        crons maps scheduled execution indexes to their parsed CronExpression.
+        """
+        if hasattr(workflow, 'scheduled_executions') and workflow.scheduled_executions:
+            intervals = [execution.repeat_interval for execution in workflow.scheduled_executions]
+        else:
+            intervals = [workflow.repeat_interval]
+        for idx, cron in (crons or {}).items():
+            # Gap between the next two fire times, which is the tightest spot for most expressions
+            first = next_cron(cron, self.clock())
+            second = next_cron(cron, first) if first is not None else None
+            intervals[idx] = second - first if second is not None else None
+        intervals = [interval for interval in intervals if interval]
+        if not intervals:
+            return []
+
+        analysis = workflow.analyze()
+        if analysis.errors:
+            return []
+        warnings = []
+        for interval in sorted(set(intervals)):
+            if interval < analysis.min_seconds:
+                warnings.append(
+                    f"'{workflow.name}' repeats every {interval} s but takes at least "
+                    f"{analysis.min_seconds:.1f} s to run, so runs will pile up"
                 )
-                self.jobs[workflow.name].append((job, 0))
-        except (ValueError, AttributeError):
-            self._run_with_count(workflow, callback, 0, workflow.execution_count)
-        
-        if workflow.repeat_interval:
-            job = schedule.every(workflow.repeat_interval).seconds.do(
-                self._run_with_count, workflow, callback, 0, workflow.execution_count
-            )
-            self.jobs[workflow.name].append((job, 0))
-
-    def _run_with_count(self, workflow, callback, idx, max_executions):
-        if workflow.name not in self.execution_counts:
-            self.execution_counts[workflow.name] = {}
-        if idx not in self.execution_counts[workflow.name]:
-            self.execution_counts[workflow.name][idx] = 0
-            
-        if max_executions == 0 or self.execution_counts[workflow.name][idx] < max_executions:
-            callback()
-            self.execution_counts[workflow.name][idx] += 1
-            
-            if max_executions > 0 and self.execution_counts[workflow.name][idx] >= max_executions:
-                self._clear_execution(workflow.name, idx)
+            elif interval < analysis.max_seconds:
+                warnings.append(
+                    f"'{workflow.name}' repeats every {interval} s but can take up to "
+                    f"{analysis.max_seconds:.1f} s to run, so runs may overlap"
+                )
+        for warning in warnings:
+            print(f"Warning: {warning}")
+        return warnings
+
+    def _plan(self, execution, cron, now):
+        """First run times of an execution's jobs as (next_run, interval, daily_at), or None to run it now"""
+        start = execution.get("execution_datetime")
+        repeat_interval = execution.get("repeat_interval")
+        start_datetime, daily_at = parse_start(start)
+        if start and start_datetime is None and daily_at is None:
+            # An unreadable start time runs straight away
+            return None
+
+        if cron is not None:
+            # The start date and time, when later than now, is when the expression starts to apply
+            # (a second early, so a fire time equal to the start counts)
+            not_before = max(now, start_datetime.timestamp() - 1) if start_datetime is not None else now
+            return [(next_cron(cron, not_before), None, None)]
+        if daily_at is not None:
+            jobs = [(next_daily(daily_at, now), None, daily_at)]
+            if repeat_interval:
+                jobs.append((now + repeat_interval, repeat_interval, None))
+            return jobs
+        if start_datetime is not None and start_datetime.timestamp() > now:
+            # A one-shot (or first) run at an exact wall-clock time, sub-second part included
+            return [(start_datetime.timestamp(), repeat_interval, None)]
+        if repeat_interval:
+            return [(now + repeat_interval, repeat_interval, None)]
+        return []
+
+    def _schedule_execution(self, name, callback, idx, execution, cron=None, next_runs=None, count=0):
+        # next_runs and count are given when restoring from the journal
+        max_executions = execution.get("execution_count") or 0
+        with self.condition:
+            self.jobs.setdefault(name, [])
+            self.execution_counts.setdefault(name, {})[idx] = count
+        now = self.clock()
+        if next_runs is not None and any(next_run is not None for next_run in next_runs):
+            # Plan as of just before the first pending run, so the plan has the jobs it had when it was made
+            now = min(next_run for next_run in next_runs if next_run is not None) - 1
+        plan = self._plan(execution, cron, now)
+        if plan is None:
+            self._run_with_count(name, callback, idx, max_executions)
+            return
+        if cron is not None and plan[0][0] is None:
+            print(f"Warning: cron expression '{cron.expression}' of '{name}' never fires")
+        if next_runs is None:
+            if self.journal is not None:
+                self.journal.record_schedule(name, idx, execution, [next_run for next_run, _, _ in plan])
+        else:
+            plan = [(next_run, interval, daily_at) for (_, interval, daily_at), next_run in zip(plan, next_runs)]
+
+        for slot, (next_run, interval, daily_at) in enumerate(plan):
+            if next_run is not None:
+                self._add_job(ScheduledJob(
+                    name, callback, idx, slot, max_executions, next_run, interval, daily_at,
+                    execution.get("misfire_policy", "fire_once"), execution.get("catch_up_limit", 3), cron
+                ))
+
+    def _add_job(self, job):
+        with self.condition:
+            self.jobs.setdefault(job.name, []).append(job)
+            self.heap.push(job, job.next_run)
+            if self.heap.peek()[1] is job:
+                # The scheduler may be sleeping towards a later deadline
+                self.condition.notify()
+
+    def _run_with_count(self, name, callback, idx, max_executions):
+        with self.condition:
+            counts = self.execution_counts.setdefault(name, {})
+            count = counts.get(idx, 0)
+            if max_executions and count >= max_executions:
+                return
+            counts[idx] = count + 1
+            if max_executions and count + 1 >= max_executions:
+                self._clear_execution(name, idx)
+        callback()
+
+    def _fire(self, job):
+        now = self.clock()
+        name = job.name
+        with self.condition:
+            if job not in self.jobs.get(name, ()):
+                return
+            missed = now - job.next_run > self.misfire_grace
+            runs = job.misfire_runs(now) if missed else 1
+            counts = self.execution_counts[name]
+            if job.max_executions:
+                runs = max(0, min(runs, job.max_executions - counts[job.idx]))
+            if missed:
+                print(f"'{name}' missed its run at {datetime.fromtimestamp(job.next_run):%Y-%m-%d %H:%M:%S}, "
+                      f"running it {runs} time(s) now ({job.misfire_policy})")
+            counts[job.idx] += runs
+            count = counts[job.idx]
+            following = None
+            if job.max_executions and count >= job.max_executions:
+                self._clear_execution(name, job.idx)
+            else:
+                following = job.following_run(now)
+                if following is None:
+                    self.jobs[name].remove(job)
+                else:
+                    job.next_run = following
+                    self.heap.push(job, following)
+            if self.journal is not None:
+                if any(other.idx == job.idx for other in self.jobs.get(name, ())):
+                    self.journal.record_fire(name, job.idx, job.slot, count, following)
+                else:
+                    # Nothing left to run for this execution
+                    self.journal.record_clear(name, job.idx)
+        for _ in range(runs):
+            try:
+                job.callback()
+            except Exception as e:
+                print(f"Scheduled run of '{name}' failed: {e}")
+
+    def record_finished(self, key, error=None):
+        """Journal that a run of the workflow scheduled under key has finished
+
+        Callbacks usually only queue the run, so whoever sees it complete
+        (e.g. the execution engine's on_finished) calls this.
+        """
+        if self.journal is not None:
+            self.journal.record_finish(key, error)
 
     def run_pending(self):
-        while True:
-            schedule.run_pending()
-            time.sleep(1)
+        """Scheduler loop: fire due jobs, then sleep until the next deadline or a change to the jobs"""
+        with self.condition:
+            while self.running:
+                head = self.heap.peek()
+                if head is None:
+                    self.condition.wait()
+                    continue
+                remaining = head[0] - self.clock()
+                if remaining > 0:
+                    # The wait runs on a monotonic clock, so re-read the wall clock now and then
+                    self.condition.wait(min(remaining, self.max_sleep))
+                    continue
+                _, job = self.heap.pop()
+                self.condition.release()
+                try:
+                    self._fire(job)
+                finally:
+                    self.condition.acquire()
 
     def start_scheduler(self):
-        threading.Thread(target=self.run_pending, daemon=True).start()
+        """Start the scheduler thread; does nothing if it is already running"""
+        with self.condition:
+            if self.thread is not None and self.thread.is_alive():
+                return
+            self.running = True
+            self.thread = threading.Thread(target=self.run_pending, name="Scheduler", daemon=True)
+            self.thread.start()
+
+    def stop_scheduler(self, timeout=1.0):
+        with self.condition:
+            self.running = False
+            thread, self.thread = self.thread, None
+            self.condition.notify_all()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def next_run(self):
+        """Timestamp of the earliest scheduled trigger, or None"""
+        with self.condition:
+            head = self.heap.peek()
+            return head[0] if head is not None else None
 
     def clear_jobs(self):
-        schedule.clear()
-        self.jobs = {}
-        self.execution_counts = {}
+        with self.condition:
+            if self.journal is not None:
+                for name in list(self.jobs):
+                    self.journal.record_clear(name)
+            self.heap.clear()
+            self.jobs = {}
+            self.execution_counts = {}
+            self.condition.notify()
+
+    def has_jobs(self, workflow_name):
+        with self.condition:
+            return bool(self.jobs.get(workflow_name))
 
     def clear_jobs_for_workflow(self, workflow_name):
-        if workflow_name in self.jobs:
-            for job, _ in self.jobs[workflow_name]:
-                schedule.cancel_job(job)
-            del self.jobs[workflow_name]
-        
-        if workflow_name in self.execution_counts:
-            del self.execution_counts[workflow_name]
+        with self.condition:
+            for job in self.jobs.pop(workflow_name, ()):
+                self.heap.remove(job)
+            self.execution_counts.pop(workflow_name, None)
+            if self.journal is not None:
+                self.journal.record_clear(workflow_name)
+            self.condition.notify()
 
     def _clear_execution(self, workflow_name, idx):
-        if workflow_name in self.jobs:
-            for i, (job, job_idx) in enumerate(self.jobs[workflow_name]):
-                if job_idx == idx:
-                    schedule.cancel_job(job)
-                    self.jobs[workflow_name].pop(i)
-                    break
-                    
-            if workflow_name in self.execution_counts and idx in self.execution_counts[workflow_name]:
-                del self.execution_counts[workflow_name][idx]
\ No newline at end of file
+        # Called with the condition held
+        jobs = self.jobs.get(workflow_name)
+        if jobs is None:
+            return
+        for job in [job for job in jobs if job.idx == idx]:
+            self.heap.remove(job)
+            jobs.remove(job)
+        self.execution_counts.get(workflow_name, {}).pop(idx, None)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def shutdown_scheduler():
+    """Stop the process-wide scheduler if it was ever started; its journal keeps the jobs for next time"""
+    global _scheduler
+    with _scheduler_lock:
+        scheduler, _scheduler = _scheduler, None
+    if scheduler is not None:
+        scheduler.stop_scheduler()
+        if scheduler.journal is not None:
+            scheduler.journal.close()
+
+def get_scheduler(journal_path=None):
+    """Return the process-wide scheduler, starting its thread on first use
+
+    journal_path (only used on first use) is where its ScheduleJournal lives.
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            journal = None
+            if journal_path:
+                try:
+                    journal = ScheduleJournal(journal_path)
+                except OSError as e:
+                    print(f"Could not open scheduler journal '{journal_path}', schedules will not persist: {e}")
+            _scheduler = SchedulingService(journal=journal)
+            _scheduler.start_scheduler()
+        return _scheduler
@@ -0,0 +1,152 @@
+import threading
+import time
+import numpy as np
+
+class MssGrabber:
+    """Grabs regions with mss, which uses XShmGetImage on X11 where the server allows it"""
+
+    name = "mss"
+    channels = 4
+
+    def __init__(self):
+        import mss
+        self._factory = getattr(mss, "MSS", None) or mss.mss
+        # mss handles are bound to the thread that opened them
+        self._local = threading.local()
+        self._handles = []
+        self._lock = threading.Lock()
+
+    def _handle(self):
+        handle = getattr(self._local, "handle", None)
+        if handle is None:
+            handle = self._local.handle = self._factory()
+            with self._lock:
+                self._handles.append(handle)
+        return handle
+
+    def screen_region(self):
+        monitor = self._handle().monitors[1]
+        return (monitor["left"], monitor["top"], monitor["width"], monitor["height"])
+
+    def grab_into(self, region, buffer):
+        x, y, w, h = region
+        shot = self._handle().grab({"left": x, "top": y, "width": w, "height": h})
+        np.copyto(buffer, np.frombuffer(shot.raw, dtype=np.uint8).reshape(h, w, 4))
+
+    def close(self):
+        with self._lock:
+            handles, self._handles = self._handles, []
+        for handle in handles:
+            try:
+                handle.close()
+            except Exception:
+                pass
+
+
+class PyAutoGUIGrabber:
+    name = "pyautogui"
+    channels = 3
+
+    def screen_region(self):
+        import pyautogui
+        width, height = pyautogui.size()
+        return (0, 0, width, height)
+
+    def grab_into(self, region, buffer):
+        import pyautogui
+        np.copyto(buffer, np.asarray(pyautogui.screenshot(region=region).convert("RGB")))
+
+    def close(self):
+        pass
+
+
+def create_grabber():
+    """mss if it is installed and can reach the display, pyautogui otherwise"""
+    try:
+        grabber = MssGrabber()
+        grabber.screen_region()
+        return grabber
+    except Exception:
+        return PyAutoGUIGrabber()
+
+
+class _RegionFrames:
+    def __init__(self, shape):
+        # Two buffers, so a frame handed out stays intact while the next one is captured
+        self.buffers = [np.empty(shape, dtype=np.uint8) for _ in range(2)]
+        self.current = 1
+        self.frame = None
+        self.captured_ns = 0
+        self.lock = threading.Lock()
+
+
+class ScreenCapture:
+    """Shared capture of screen regions as read-only NumPy frames
+
+    Frames are views over per-region buffers that are reused for every grab, so
+    polling allocates nothing. Requests for the same region within one tick
+    (from any thread or workflow) share a single capture. A frame stays valid
+    until the second capture of its region after it, so callers should use it
+    right away rather than keep it.
+    """
+
+    def __init__(self, grabber=None, tick=1 / 60, max_regions=64):
+        self.grabber = grabber
+        self.tick_ns = int(tick * 1e9)
+        self.max_regions = max_regions
+        self.regions = {}
+        self.lock = threading.Lock()
+        self.captures = 0
+        self.coalesced = 0
+
+    def _grabber(self):
+        with self.lock:
+            if self.grabber is None:
+                self.grabber = create_grabber()
+            return self.grabber
+
+    def grab(self, region=None):
+        """Return an HxWxC uint8 frame of region (x, y, width, height), or of the primary screen"""
+        grabber = self._grabber()
+        if region is None:
+            region = grabber.screen_region()
+        region = tuple(int(value) for value in region)
+        with self.lock:
+            frames = self.regions.get(region)
+            if frames is None:
+                if len(self.regions) >= self.max_regions:
+                    self.regions.pop(next(iter(self.regions)))
+                frames = self.regions[region] = _RegionFrames((region[3], region[2], grabber.channels))
+
+        # Holding the region's lock while grabbing makes concurrent callers wait for this capture
+        with frames.lock:
+            if frames.frame is not None and time.perf_counter_ns() - frames.captured_ns < self.tick_ns:
+                with self.lock:
+                    self.coalesced += 1
+                return frames.frame
+            frames.current = 1 - frames.current
+            buffer = frames.buffers[frames.current]
+            grabber.grab_into(region, buffer)
+            frame = buffer.view()
+            frame.flags.writeable = False
+            frames.frame = frame
+            frames.captured_ns = time.perf_counter_ns()
+            with self.lock:
+                self.captures += 1
+            return frame
+
+    def stats(self):
+        with self.lock:
+            return {
+                "backend": self.grabber.name if self.grabber is not None else None,
+                "regions": len(self.regions),
+                "captures": self.captures,
+                "coalesced": self.coalesced,
+            }
+
+    def close(self):
+        with self.lock:
+            grabber, self.grabber = self.grabber, None
+            self.regions = {}
+        if grabber is not None:
+            grabber.close()
@@ -0,0 +1,150 @@
+import os
+import signal
+import subprocess
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_LINE_CHARS = 4096
+
+class ScriptJob:
+    def __init__(self, command, timeout=None, max_output_lines=1000, on_output=None):
+        self.command = command
+        self.timeout = timeout
+        self.on_output = on_output
+        self.output = deque(maxlen=max_output_lines)
+        self.returncode = None
+        self.timed_out = False
+        self.killed = False
+        self.error = None
+        self.process = None
+        self.timer = None
+        self.lock = threading.Lock()
+        self.done = threading.Event()
+
+    def wait(self, timeout=None):
+        """Wait for the command to finish, returning False if timeout expired first"""
+        return self.done.wait(timeout)
+
+    def kill(self):
+        """Kill the shell and everything it started, so no child keeps the pipes open
+
+        A job that has not started yet never will, and its waiters wake at once.
+        """
+        with self.lock:
+            process = self.process
+            if process is None:
+                self.killed = True
+                self.done.set()
+                return
+        if process.poll() is not None:
+            return
+        try:
+            if os.name == "nt":
+                subprocess.run(
+                    ["taskkill", "/F", "/T", "/PID", str(process.pid)],
+                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+                )
+            else:
+                os.killpg(process.pid, signal.SIGKILL)
+        except OSError:
+            process.kill()
+
+    def check(self):
+        """Raise if the command could not run, timed out or exited with a non-zero status"""
+        if self.timed_out:
+            raise RuntimeError(f"Command '{self.command}' timed out after {self.timeout} seconds")
+        if self.killed:
+            raise RuntimeError(f"Command '{self.command}' was stopped before it started")
+        if self.error is not None:
+            raise RuntimeError(f"Command '{self.command}' could not be run: {self.error}")
+        if self.returncode:
+            raise RuntimeError(f"Command '{self.command}' exited with status {self.returncode}")
+
+    def _emit(self, stream, line):
+        line = line.rstrip("\r\n")
+        self.output.append((stream, line))
+        if self.on_output is not None:
+            self.on_output(self, stream, line)
+
+    def _read(self, pipe, stream):
+        for line in iter(lambda: pipe.readline(MAX_LINE_CHARS), ""):
+            self._emit(stream, line)
+        pipe.close()
+
+    def start_timer(self):
+        """Start the timeout clock; called on submit, so time spent queued counts too"""
+        if self.timeout:
+            self.timer = threading.Timer(self.timeout, self._timeout)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def _timeout(self):
+        with self.lock:
+            self.timed_out = True
+        self.kill()
+
+    def run(self):
+        try:
+            with self.lock:
+                if self.timed_out or self.killed:
+                    # Timed out or killed while still queued
+                    return
+                self.process = subprocess.Popen(
+                    self.command, shell=True, stdin=subprocess.DEVNULL,
+                    stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                    text=True, errors="replace", bufsize=1,
+                    start_new_session=os.name != "nt"
+                )
+            stderr_reader = threading.Thread(target=self._read, args=(self.process.stderr, "stderr"), daemon=True)
+            stderr_reader.start()
+            self._read(self.process.stdout, "stdout")
+            stderr_reader.join()
+            self.returncode = self.process.wait()
+        except Exception as e:
+            self.error = e
+        finally:
+            if self.timer is not None:
+                self.timer.cancel()
+            self.done.set()
+
+
+class ScriptRunner:
+    """Runs script actions on a bounded thread pool so they never block the caller
+
+    Jobs nobody waits for straight away ('background' and 'join later') get a
+    thread of their own, so long-running ones can't hold up the pool. Every
+    job is tracked until it ends, so shutdown() can kill what is still running.
+    """
+
+    def __init__(self, max_workers=4, max_output_lines=1000):
+        self.max_output_lines = max_output_lines
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="clicky-script")
+        self.jobs = set()
+        self.lock = threading.Lock()
+
+    def submit(self, command, timeout=None, on_output=None, detached=False):
+        job = ScriptJob(command, timeout, self.max_output_lines, on_output)
+        with self.lock:
+            self.jobs.add(job)
+        job.start_timer()
+        if detached:
+            threading.Thread(target=self._run, args=(job,), name="clicky-script-detached", daemon=True).start()
+        else:
+            self.executor.submit(self._run, job)
+        return job
+
+    def _run(self, job):
+        try:
+            job.run()
+        finally:
+            with self.lock:
+                self.jobs.discard(job)
+
+    def shutdown(self):
+        """Drop queued jobs and kill running ones along with everything they started"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        with self.lock:
+            jobs, self.jobs = self.jobs, set()
+        for job in jobs:
+            job.kill()
@@ -0,0 +1,100 @@
+import os
+import signal
+import subprocess
+import threading
+import uuid
+from .script_runner import MAX_LINE_CHARS, ScriptJob
+
+class ShellSession:
+    """A long-lived /bin/sh that script commands are piped into one at a time
+
+    Each command runs through "command eval" with stdin from /dev/null, so a
+    syntax error cannot kill the shell. It is followed by a marker line with
+    its exit status on stdout and a bare marker on stderr, so both streams
+    are drained before the command counts as done.
+    """
+
+    def __init__(self, shell="/bin/sh", max_output_lines=1000):
+        self.max_output_lines = max_output_lines
+        self.marker = f"__clicky_{uuid.uuid4().hex}__"
+        self.lock = threading.Lock()
+        self.state_lock = threading.Lock()
+        self.job = None
+        self.pending_streams = 0
+        self.process = subprocess.Popen(
+            [shell], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            text=True, errors="replace", bufsize=1, start_new_session=True
+        )
+        for pipe, stream in ((self.process.stdout, "stdout"), (self.process.stderr, "stderr")):
+            threading.Thread(target=self._read, args=(pipe, stream), daemon=True).start()
+
+    @staticmethod
+    def supported():
+        return os.name == "posix" and os.path.exists("/bin/sh")
+
+    @property
+    def alive(self):
+        return self.process.poll() is None
+
+    def run(self, command, timeout=None, on_output=None):
+        with self.lock:
+            job = ScriptJob(command, timeout, self.max_output_lines, on_output)
+            job.process = self.process
+            with self.state_lock:
+                self.job = job
+                self.pending_streams = 2
+            quoted = "'" + command.replace("'", "'\\''") + "'"
+            try:
+                self.process.stdin.write(
+                    f"command eval {quoted} </dev/null\n"
+                    f"__clicky_status=$?\n"
+                    f"printf '%s %d\\n' {self.marker} \"$__clicky_status\"\n"
+                    f"printf '%s\\n' {self.marker} >&2\n"
+                )
+                self.process.stdin.flush()
+            except OSError as e:
+                job.error = e
+                job.done.set()
+                return job
+
+            if not job.wait(timeout):
+                job.timed_out = True
+                self.close()
+                job.done.set()
+            return job
+
+    def close(self):
+        if not self.alive:
+            return
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except OSError:
+            self.process.kill()
+        self.process.wait()
+
+    def _finish_stream(self, job):
+        with self.state_lock:
+            self.pending_streams -= 1
+            if self.pending_streams == 0:
+                job.done.set()
+
+    def _read(self, pipe, stream):
+        for line in iter(lambda: pipe.readline(MAX_LINE_CHARS), ""):
+            job = self.job
+            if job is None:
+                continue
+            index = line.find(self.marker)
+            if index == -1:
+                job._emit(stream, line)
+                continue
+            if index:
+                job._emit(stream, line[:index])
+            if stream == "stdout":
+                job.returncode = int(line[index + len(self.marker):].strip() or 0)
+            self._finish_stream(job)
+
+        # The command ran "exit" (or the shell was killed): report the shell's status
+        job = self.job
+        if job is not None and not job.done.is_set():
+            job.returncode = self.process.wait()
+            job.done.set()
@@ -0,0 +1,228 @@
+import os
+import numpy as np
+from .automation_service import PASTE_SETTLE_SECONDS, AutomationService
+from .input_backends import InputBackend
+from .timing import NS_PER_SECOND
+
+class VirtualClock:
+    """Clock with the PrecisionClock interface whose sleeps return at once and just move time on"""
+
+    def __init__(self):
+        self.now = 0
+
+    def now_ns(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += int(seconds * NS_PER_SECOND)
+
+    def sleep(self, seconds, cancel=None):
+        return self.sleep_until(self.now + int(seconds * NS_PER_SECOND), cancel)
+
+    def sleep_until(self, deadline_ns, cancel=None):
+        if cancel is not None and cancel.is_set():
+            return False
+        self.now = max(self.now, deadline_ns)
+        return True
+
+
+class VirtualScreen:
+    """A blank screen (or desktop spanning several screens) of a fixed size"""
+
+    def __init__(self, width=1920, height=1080, left=0, top=0):
+        self.width = width
+        self.height = height
+        self.left = left
+        self.top = top
+
+    def contains(self, x, y):
+        return self.left <= x < self.left + self.width and self.top <= y < self.top + self.height
+
+    def contains_region(self, region):
+        x, y, w, h = region
+        return self.contains(x, y) and self.contains(x + w - 1, y + h - 1)
+
+    def grab(self, region=None):
+        x, y, w, h = region if region is not None else (self.left, self.top, self.width, self.height)
+        return np.zeros((h, w, 4), dtype=np.uint8)
+
+
+class SimulationBackend(InputBackend):
+    """Records events against a virtual clock and flags coordinates that are off the screen"""
+
+    name = "simulation"
+
+    def __init__(self, clock, screen, event_cost=0.0):
+        self.clock = clock
+        self.screen = screen
+        self.event_cost = event_cost
+        self.events = []
+        self.out_of_bounds = []
+        self.action_index = None
+
+    def record(self, event, *args):
+        self.events.append((self.clock.now_ns(), self.action_index, event, args))
+        self.clock.advance(self.event_cost)
+
+    def check(self, x, y):
+        if x is not None and y is not None and not self.screen.contains(x, y):
+            self.out_of_bounds.append((self.action_index, x, y))
+
+    def move_to(self, x, y):
+        self.check(x, y)
+        self.record("move_to", x, y)
+
+    def click(self, x, y, clicks=1, button="left"):
+        self.check(x, y)
+        self.record("click", x, y, clicks, button)
+
+    def mouse_down(self, x, y, button="left"):
+        self.check(x, y)
+        self.record("mouse_down", x, y, button)
+
+    def mouse_up(self, button="left"):
+        self.record("mouse_up", button)
+
+    def scroll(self, amount, x, y):
+        self.check(x, y)
+        self.record("scroll", amount, x, y)
+
+    def drag_to(self, x, y, button="left"):
+        self.check(x, y)
+        self.record("drag_to", x, y, button)
+
+    def write(self, text):
+        self.record("write", text)
+
+    def type_text(self, text):
+        self.record("type_text", text)
+
+    def press(self, key):
+        self.record("press", key)
+
+    def key_down(self, key):
+        self.record("key_down", key)
+
+    def key_up(self, key):
+        self.record("key_up", key)
+
+
+class SimulationResult:
+    def __init__(self, workflow, events, duration, out_of_bounds, notes, error=None):
+        self.workflow = workflow
+        self.events = events
+        self.duration = duration
+        self.out_of_bounds = out_of_bounds
+        self.notes = notes
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None and not self.out_of_bounds
+
+    def to_dict(self):
+        return {
+            "workflow": self.workflow,
+            "duration": self.duration,
+            "events": [
+                {"time": time_ns / NS_PER_SECOND, "action": index, "event": event, "args": list(args)}
+                for time_ns, index, event, args in self.events
+            ],
+            "out_of_bounds": [
+                {"action": index, "x": x, "y": y} for index, x, y in self.out_of_bounds
+            ],
+            "notes": self.notes,
+            "error": self.error,
+        }
+
+
+class SimulationService(AutomationService):
+    """Runs workflows through the normal engine against a virtual screen and clock
+
+    Nothing is injected, no scripts are started and the clipboard is never
+    touched. Visual waits cannot see a
+    real screen, so they are assumed to succeed on their first poll ('change')
+    or after their stable time ('stable'), and image matches land at the centre
+    of the searched region; each assumption is added to the result's notes.
+    """
+
+    def __init__(self, screen=None, step_cost=0.001, max_steps=1000000):
+        self.virtual_clock = VirtualClock()
+        self.virtual_screen = screen if screen is not None else VirtualScreen()
+        AutomationService.__init__(self, SimulationBackend(self.virtual_clock, self.virtual_screen))
+        self.clock = self.virtual_clock
+        # Even instant actions take some time. Repeat bodies always hold an action (the plan
+        # compiler rejects empty ones), so this also keeps time-bounded repeats finite
+        self.step_cost = step_cost
+        self.max_steps = max_steps
+        self.steps = 0
+        self.notes = []
+
+    def grab_region(self, region=None):
+        return self.virtual_screen.grab(region)
+
+    def note(self, message):
+        self.notes.append(f"Step {self.backend.action_index + 1}: {message}")
+
+    def check_region(self, region):
+        if region is not None and not self.virtual_screen.contains_region(region):
+            x, y, w, h = region
+            self.backend.out_of_bounds.append((self.backend.action_index, x + w - 1, y + h - 1))
+
+    def run_step(self, step, context):
+        if not step.is_control:
+            self.steps += 1
+            if self.steps > self.max_steps:
+                raise RuntimeError(f"Simulation stopped after {self.max_steps} steps")
+            self.backend.action_index = step.index
+            self.virtual_clock.advance(self.step_cost)
+        AutomationService.run_step(self, step, context)
+
+    def op_script(self, context, command, mode, timeout, isolated):
+        self.backend.record("script", command, mode)
+        self.note(f"script '{command}' was not run")
+
+    def paste_text(self, context, text):
+        self.backend.record("paste", text)
+        clock = context.timer.clock
+        clock.sleep_until(clock.now_ns() + int(PASTE_SETTLE_SECONDS * 1e9), context.token)
+        context.token.raise_if_cancelled()
+        self.note("text was not put on the clipboard")
+
+    def op_wait_image(self, context, image, region, timeout, interval, threshold):
+        self.check_region(region)
+        screen = self.virtual_screen
+        x, y, w, h = region if region is not None else (screen.left, screen.top, screen.width, screen.height)
+        context.match = (x + w // 2, y + h // 2)
+        self.backend.record("wait_image", image)
+        if not os.path.exists(image):
+            self.note(f"reference image '{image}' does not exist")
+        self.note(f"assumed '{image}' is found at once, at {context.match}")
+
+    def op_wait_change(self, context, region, mode, timeout, interval, tolerance, stable_for):
+        self.check_region(region)
+        context.timer.wait(interval if mode == "change" else stable_for)
+        self.backend.record("wait_change", list(region), mode)
+        self.note(f"assumed the region {'changes' if mode == 'change' else 'settles'} without delay")
+
+    def simulate(self, workflow):
+        """Run workflow in virtual time and return a SimulationResult"""
+        self.virtual_clock.now = 0
+        self.backend.events = []
+        self.backend.out_of_bounds = []
+        self.notes = []
+        self.steps = 0
+        self.check_region(workflow.pacing.settle_region if workflow.pacing.mode == "adaptive" else None)
+        error = None
+        try:
+            self.execute_workflow(workflow)
+        except Exception as e:
+            error = str(e)
+        return SimulationResult(
+            workflow.name, list(self.backend.events), self.virtual_clock.now / NS_PER_SECOND,
+            list(self.backend.out_of_bounds), list(self.notes), error
+        )
+
+
+def simulate_workflow(workflow, width=1920, height=1080, left=0, top=0, max_steps=1000000):
+    return SimulationService(VirtualScreen(width, height, left, top), max_steps=max_steps).simulate(workflow)
@@ -0,0 +1,83 @@
+class TimerHeap:
+    """Binary min-heap of deadlines keyed by job, with an index of each key's position
+
+    push, remove and pop are O(log n); peek is O(1). Ties on the deadline go
+    to the key pushed first.
+    """
+
+    def __init__(self):
+        self.entries = []
+        self.positions = {}
+        self.sequence = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.positions
+
+    def push(self, key, deadline):
+        """Add key, or move it to deadline if it is already in the heap"""
+        if key in self.positions:
+            self.remove(key)
+        self.sequence += 1
+        self.entries.append((deadline, self.sequence, key))
+        self.positions[key] = len(self.entries) - 1
+        self._sift_up(len(self.entries) - 1)
+
+    def remove(self, key):
+        """Remove key if it is in the heap; return whether it was"""
+        index = self.positions.pop(key, None)
+        if index is None:
+            return False
+        last = self.entries.pop()
+        if index < len(self.entries):
+            self.entries[index] = last
+            self.positions[last[2]] = index
+            self._sift_up(index)
+            self._sift_down(self.positions[last[2]])
+        return True
+
+    def peek(self):
+        """(deadline, key) of the earliest entry, or None if the heap is empty"""
+        if not self.entries:
+            return None
+        deadline, _, key = self.entries[0]
+        return deadline, key
+
+    def pop(self):
+        deadline, key = self.peek()
+        self.remove(key)
+        return deadline, key
+
+    def clear(self):
+        self.entries = []
+        self.positions = {}
+
+    def _swap(self, i, j):
+        entries = self.entries
+        entries[i], entries[j] = entries[j], entries[i]
+        self.positions[entries[i][2]] = i
+        self.positions[entries[j][2]] = j
+
+    def _sift_up(self, index):
+        entries = self.entries
+        while index > 0:
+            parent = (index - 1) // 2
+            if entries[index][:2] >= entries[parent][:2]:
+                break
+            self._swap(index, parent)
+            index = parent
+
+    def _sift_down(self, index):
+        entries = self.entries
+        size = len(entries)
+        while True:
+            smallest = index
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < size and entries[child][:2] < entries[smallest][:2]:
+                    smallest = child
+            if smallest == index:
+                break
+            self._swap(index, smallest)
+            index = smallest
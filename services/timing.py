@@ -0,0 +1,73 @@
+import time
+from .cancellation import RunCancelled
+
+NS_PER_SECOND = 1_000_000_000
+
+class PrecisionClock:
+    """Sleeps coarsely with the OS timer, then spins on perf_counter_ns for the last stretch"""
+
+    def __init__(self, spin_seconds=0.002):
+        self.spin_ns = int(spin_seconds * NS_PER_SECOND)
+
+    def now_ns(self):
+        return time.perf_counter_ns()
+
+    def sleep(self, seconds, cancel=None):
+        return self.sleep_until(time.perf_counter_ns() + int(seconds * NS_PER_SECOND), cancel)
+
+    def sleep_until(self, deadline_ns, cancel=None):
+        """Return False if cancel (anything with wait/is_set, like threading.Event) fired first"""
+        while True:
+            remaining_ns = deadline_ns - time.perf_counter_ns()
+            if remaining_ns <= 0:
+                return True
+            if cancel is not None and cancel.is_set():
+                return False
+            if remaining_ns > self.spin_ns:
+                coarse = (remaining_ns - self.spin_ns) / NS_PER_SECOND
+                if cancel is not None:
+                    cancel.wait(coarse)
+                else:
+                    time.sleep(coarse)
+            else:
+                time.sleep(0)
+
+
+class RunTimer:
+    """Per-run wait scheduler that carries timing drift forward so it does not accumulate"""
+
+    def __init__(self, clock=None, cancel=None):
+        # cancel is a CancellationToken; a cancelled wait raises RunCancelled
+        self.clock = clock if clock is not None else PrecisionClock()
+        self.cancel = cancel
+        self.planned_ns = 0
+        self.actual_ns = 0
+        self.max_drift_ns = 0
+        self.waits = 0
+
+    @property
+    def drift_ns(self):
+        return self.actual_ns - self.planned_ns
+
+    def wait(self, seconds):
+        planned_ns = int(seconds * NS_PER_SECOND)
+        start_ns = self.clock.now_ns()
+        # Shorten (or lengthen) this wait by the drift left over from earlier ones
+        deadline_ns = max(start_ns, start_ns + planned_ns - self.drift_ns)
+        completed = self.clock.sleep_until(deadline_ns, self.cancel)
+        self.planned_ns += planned_ns
+        self.actual_ns += self.clock.now_ns() - start_ns
+        self.max_drift_ns = max(self.max_drift_ns, abs(self.drift_ns))
+        self.waits += 1
+        if not completed:
+            self.cancel.raise_if_cancelled()
+            raise RunCancelled("Wait cancelled")
+
+    def summary(self):
+        return {
+            "waits": self.waits,
+            "planned_wait_ms": self.planned_ns / 1e6,
+            "actual_wait_ms": self.actual_ns / 1e6,
+            "drift_ms": self.drift_ns / 1e6,
+            "max_drift_ms": self.max_drift_ns / 1e6,
+        }
@@ -0,0 +1,184 @@
+import csv
+import json
+import math
+import threading
+from array import array
+
+class LatencyHistogram:
+    """Log-bucketed histogram (4 buckets per power of two, from 1 µs) with percentile estimates"""
+
+    BUCKETS_PER_OCTAVE = 4
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def _bucket(self, value_ns):
+        if value_ns < 1000:
+            return 0
+        return int(math.log2(value_ns / 1000) * self.BUCKETS_PER_OCTAVE) + 1
+
+    def _upper_bound_ns(self, bucket):
+        return 1000 * 2 ** (bucket / self.BUCKETS_PER_OCTAVE)
+
+    def record(self, value_ns):
+        bucket = self._bucket(value_ns)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.count += 1
+        self.total_ns += value_ns
+        self.max_ns = max(self.max_ns, value_ns)
+
+    def percentile(self, p):
+        """Upper bound of the bucket holding the p-th percentile, in nanoseconds"""
+        if not self.count:
+            return 0.0
+        rank = math.ceil(self.count * p / 100)
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                return min(self._upper_bound_ns(bucket), self.max_ns)
+        return float(self.max_ns)
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_ms": self.total_ns / self.count / 1e6 if self.count else 0.0,
+            "p50_ms": self.percentile(50) / 1e6,
+            "p95_ms": self.percentile(95) / 1e6,
+            "p99_ms": self.percentile(99) / 1e6,
+            "max_ms": self.max_ns / 1e6,
+        }
+
+
+class TraceRing:
+    """Fixed-capacity ring of action traces, numbers packed in int64 arrays"""
+
+    # pace_ns is the pacing waited between the previous step and this one
+    FIELDS = ("start_ns", "end_ns", "backend_ns", "sleep_ns", "pace_ns")
+
+    def __init__(self, capacity=10000):
+        self.capacity = capacity
+        self.columns = {name: array("q", bytes(8 * capacity)) for name in self.FIELDS}
+        self.labels = [None] * capacity
+        self.next = 0
+        self.size = 0
+
+    def append(self, label, values):
+        position = self.next
+        for name, value in zip(self.FIELDS, values):
+            self.columns[name][position] = value
+        self.labels[position] = label
+        self.next = (position + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def __iter__(self):
+        start = (self.next - self.size) % self.capacity
+        for offset in range(self.size):
+            position = (start + offset) % self.capacity
+            workflow, run_id, index, action_type, outcome = self.labels[position]
+            record = {
+                "workflow": workflow,
+                "run": run_id,
+                "index": index,
+                "action_type": action_type,
+                "outcome": outcome,
+            }
+            for name in self.FIELDS:
+                record[name] = self.columns[name][position]
+            yield record
+
+
+class Tracer:
+    """Collects per-action timings for every run and aggregates them into histograms"""
+
+    def __init__(self, capacity=10000):
+        self.enabled = True
+        self.lock = threading.Lock()
+        self.ring = TraceRing(capacity)
+        self.by_workflow = {}
+        self.by_action_type = {}
+        self.run_durations = {}
+        self.runs = 0
+
+    def next_run_id(self):
+        with self.lock:
+            self.runs += 1
+            return self.runs
+
+    def record(self, workflow_name, run_id, step, outcome, start_ns, end_ns, backend_ns, sleep_ns, pace_ns):
+        """Record one step; a batch is recorded as one trace per action in it
+
+        A batch is injected in one call, so its actions share its time in
+        proportion to their input events, and the pacing before it goes to
+        the first one.
+        """
+        if not self.enabled:
+            return
+        members = getattr(step, "steps", None) or [step]
+        weights = [max(1, len(member.events or ())) for member in members]
+        total = sum(weights)
+
+        def share(value, before, weight):
+            return value * (before + weight) // total - value * before // total
+
+        with self.lock:
+            before = 0
+            for member, weight in zip(members, weights):
+                member_start_ns = start_ns + share(end_ns - start_ns, 0, before)
+                member_end_ns = member_start_ns + share(end_ns - start_ns, before, weight)
+                member_pace_ns = pace_ns if before == 0 else 0
+                self.ring.append(
+                    (workflow_name, run_id, member.index, member.action_type, outcome),
+                    (member_start_ns, member_end_ns, share(backend_ns, before, weight),
+                     share(sleep_ns, before, weight), member_pace_ns)
+                )
+                duration_ns = member_end_ns - member_start_ns
+                if workflow_name not in self.by_workflow:
+                    self.by_workflow[workflow_name] = LatencyHistogram()
+                self.by_workflow[workflow_name].record(duration_ns + member_pace_ns)
+                if member.action_type not in self.by_action_type:
+                    self.by_action_type[member.action_type] = LatencyHistogram()
+                self.by_action_type[member.action_type].record(duration_ns)
+                before += weight
+
+    def record_run(self, workflow_name, duration_ns):
+        if not self.enabled:
+            return
+        with self.lock:
+            if workflow_name not in self.run_durations:
+                self.run_durations[workflow_name] = LatencyHistogram()
+            self.run_durations[workflow_name].record(duration_ns)
+
+    def traces(self):
+        with self.lock:
+            return list(self.ring)
+
+    def summary(self):
+        with self.lock:
+            return {
+                "runs": self.runs,
+                "workflows": {name: hist.summary() for name, hist in self.by_workflow.items()},
+                "action_types": {name: hist.summary() for name, hist in self.by_action_type.items()},
+                "run_durations": {name: hist.summary() for name, hist in self.run_durations.items()},
+            }
+
+    def clear(self):
+        with self.lock:
+            self.ring = TraceRing(self.ring.capacity)
+            self.by_workflow = {}
+            self.by_action_type = {}
+            self.run_durations = {}
+
+    def export_json(self, filepath):
+        with open(filepath, 'w') as f:
+            json.dump({"summary": self.summary(), "traces": self.traces()}, f, indent=2)
+
+    def export_csv(self, filepath):
+        fields = ["workflow", "run", "index", "action_type", "outcome"] + list(TraceRing.FIELDS)
+        with open(filepath, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(self.traces())
@@ -0,0 +1,300 @@
+import math
+from .action_plan import compile_workflow, parse_structure
+from .automation_service import PASTE_SETTLE_SECONDS, TEXT_CHUNK_CHARS
+
+class _NoOps:
+    """Stands in for AutomationService so a plan can be compiled without running anything"""
+
+    def __getattr__(self, name):
+        if name.startswith("op_"):
+            return None
+        raise AttributeError(name)
+
+
+class _Segment:
+    """Estimated cost of a run of steps; first/last are the steps whose pacing joins it to its neighbours"""
+
+    def __init__(self, low=0.0, high=0.0, first=None, last=None):
+        self.low = low
+        self.high = high
+        self.first = first
+        self.last = last
+
+
+class WorkflowAnalysis:
+    def __init__(self, workflow_name):
+        self.workflow = workflow_name
+        self.min_seconds = 0.0
+        self.max_seconds = 0.0
+        self.unbounded = []
+        self.drag_distance = 0.0
+        self.out_of_bounds = []
+        self.redundant = []
+        self.critical_path = []
+        self.errors = []
+
+    @property
+    def ok(self):
+        return not self.errors and not self.out_of_bounds
+
+    def to_dict(self):
+        return {
+            "workflow": self.workflow,
+            "min_seconds": self.min_seconds,
+            "max_seconds": self.max_seconds,
+            "unbounded": self.unbounded,
+            "drag_distance": self.drag_distance,
+            "out_of_bounds": [{"action": index, "x": x, "y": y} for index, x, y in self.out_of_bounds],
+            "redundant": [{"action": index, "reason": reason} for index, reason in self.redundant],
+            "critical_path": [{"action": index, "action_type": action_type, "seconds": seconds}
+                              for index, action_type, seconds in self.critical_path],
+            "errors": self.errors,
+        }
+
+    def summary(self):
+        """Human-readable report, one finding per line"""
+        if self.errors:
+            return [f"Error: {error}" for error in self.errors]
+        if math.isclose(self.min_seconds, self.max_seconds):
+            lines = [f"Estimated duration: {self.min_seconds:.2f} s"]
+        else:
+            lines = [f"Estimated duration: {self.min_seconds:.2f} to {self.max_seconds:.2f} s"]
+        for index in self.unbounded:
+            lines.append(f"Step {index + 1}: has no time limit, so the run may take longer")
+        for index, x, y in self.out_of_bounds:
+            lines.append(f"Step {index + 1}: ({x}, {y}) is off the screen")
+        for index, reason in self.redundant:
+            lines.append(f"Step {index + 1}: {reason}")
+        if self.critical_path:
+            lines.append("Longest steps: " + ", ".join(
+                f"{index + 1} {action_type} ({seconds:.2f} s)" for index, action_type, seconds in self.critical_path
+            ))
+        return lines
+
+
+class WorkflowAnalyzer:
+    """Estimates a workflow's run time and finds suspicious steps without running it
+
+    Waits on the screen count as instant for the minimum and as their timeout
+    for the maximum. Scripts without a timeout are reported as unbounded.
+    """
+
+    def __init__(self, screen=None, input_latency=0.0, drag_speed=None, critical_share=0.8):
+        # screen is (left, top, width, height); input_latency is added per injected action;
+        # drag_speed (pixels/second) is for backends that animate drags, None means instant
+        self.screen = screen
+        self.input_latency = input_latency
+        self.drag_speed = drag_speed
+        self.critical_share = critical_share
+
+    def analyze(self, workflow):
+        analysis = WorkflowAnalysis(workflow.name)
+        try:
+            plan = compile_workflow(workflow, _NoOps())
+            nodes, blocks = parse_structure(workflow.actions)
+        except ValueError as e:
+            analysis.errors.append(str(e))
+            return analysis
+
+        self.workflow = workflow
+        self.analysis = analysis
+        self.contributions = {}
+        total = self.sequence(list(plan), 1)
+        analysis.min_seconds = total.low
+        analysis.max_seconds = total.high
+        # Steps inside repeats and blocks are visited more than once
+        analysis.unbounded = sorted(set(analysis.unbounded))
+        analysis.out_of_bounds = sorted(set(analysis.out_of_bounds))
+
+        self.find_redundant(plan.steps)
+        used = {action.params.get("label", "").strip()
+                for action in workflow.actions if action.action_type == "run block"}
+        for label, (index, _) in blocks.items():
+            if label not in used:
+                analysis.redundant.append((index, f"block '{label}' is never run"))
+        analysis.redundant.sort()
+
+        ranked = sorted(self.contributions.items(), key=lambda item: item[1], reverse=True)
+        budget = sum(self.contributions.values()) * self.critical_share
+        for index, seconds in ranked:
+            if budget <= 0 or seconds <= 0:
+                break
+            analysis.critical_path.append((index, workflow.actions[index].action_type, seconds))
+            budget -= seconds
+        return analysis
+
+    def pace(self, step):
+        """Pacing the engine applies after step, as (min, max) seconds"""
+        pacing = self.workflow.pacing
+        if step.delay is not None:
+            return step.delay, step.delay
+        if pacing.mode == "fast":
+            return 0.0, 0.0
+        if pacing.mode == "adaptive":
+            if pacing.settle_region:
+                return pacing.min_delay, pacing.min_delay + pacing.settle_timeout
+            return pacing.min_delay, pacing.min_delay
+        return pacing.delay, pacing.delay
+
+    def join(self, left, right, weight):
+        if left.last is not None and right.first is not None:
+            low, high = self.pace(left.last)
+            self.contribute(left.last, high * weight)
+        else:
+            low = high = 0.0
+        return _Segment(
+            left.low + low + right.low, left.high + high + right.high,
+            left.first if left.first is not None else right.first,
+            right.last if right.last is not None else left.last,
+        )
+
+    def contribute(self, step, seconds):
+        self.contributions[step.index] = self.contributions.get(step.index, 0.0) + seconds
+
+    def sequence(self, steps, weight):
+        """weight is how many times these steps run, for the critical path"""
+        total = _Segment()
+        for step in steps:
+            total = self.join(total, self.step(step, weight), weight)
+        return total
+
+    def step(self, step, weight):
+        if step.op_name == "repeat":
+            body, times, duration = step.args
+            segment = self.repeat(body, times, duration, weight)
+        elif step.op_name == "run_block":
+            segment = self.sequence(step.body, weight)
+        else:
+            low, high = self.leaf(step, weight)
+            self.contribute(step, high * weight)
+            segment = _Segment(low, high, step, step)
+        if step.is_control and step.delay is not None:
+            # A delay on a repeat or run block paces what follows the whole loop
+            segment.last = step
+        return segment
+
+    def repeat(self, body, times, duration, weight):
+        if duration:
+            # Iterations start until the deadline; the last one may run past it
+            once = self.sequence(body, 0)
+            iteration = once.low + (self.pace(once.last)[0] if once.last is not None else 0.0)
+            count = math.ceil(duration / iteration) if iteration > 0 else 1
+            if times:
+                count = min(count, times)
+        else:
+            count = times
+        once = self.sequence(body, weight * count)
+        if count <= 0 or once.first is None:
+            return _Segment()
+        low, high = self.pace(once.last)
+        segment = _Segment(
+            once.low * count + low * (count - 1), once.high * count + high * (count - 1),
+            once.first, once.last,
+        )
+        if duration:
+            segment.low = min(segment.low, duration) if times else max(segment.low, duration)
+            segment.high = max(segment.high, duration)
+        self.contribute(once.last, high * (count - 1) * weight)
+        return segment
+
+    def leaf(self, step, weight):
+        op, args = step.op_name, step.args
+        if op == "inject":
+            self.check_events(step, args[0])
+            seconds = self.input_latency + self.drag_time(args[0], weight)
+            return seconds, seconds
+        if op == "inject_at_match":
+            return self.input_latency, self.input_latency
+        if op == "hold":
+            x, y, duration = args
+            self.check_point(step, x, y)
+            return duration + self.input_latency, duration + self.input_latency
+        if op == "wait":
+            return args[0], args[0]
+        if op == "text":
+            text, mode = args
+            if mode == "paste":
+                return PASTE_SETTLE_SECONDS + self.input_latency, PASTE_SETTLE_SECONDS + self.input_latency
+            chunks = max(1, math.ceil(len(text) / TEXT_CHUNK_CHARS))
+            return chunks * self.input_latency, chunks * self.input_latency
+        if op == "script":
+            command, mode, timeout, isolated = args
+            if mode != "wait":
+                return 0.0, 0.0
+            if timeout is None:
+                self.analysis.unbounded.append(step.index)
+                return 0.0, 0.0
+            return 0.0, timeout
+        if op == "wait_image":
+            image, region, timeout, interval, threshold = args
+            self.check_region(step, region)
+            return 0.0, timeout
+        if op == "wait_change":
+            region, mode, timeout, interval, tolerance, stable_for = args
+            self.check_region(step, region)
+            return (interval if mode == "change" else stable_for), timeout
+        return 0.0, 0.0
+
+    def drag_time(self, events, weight):
+        position = None
+        seconds = 0.0
+        for method, args in events:
+            if method == "move_to":
+                position = args[:2]
+            elif method == "drag_to" and position is not None:
+                distance = math.dist(position, args[:2])
+                self.analysis.drag_distance += distance * weight
+                if self.drag_speed:
+                    seconds += distance / self.drag_speed
+                position = args[:2]
+        return seconds
+
+    def check_events(self, step, events):
+        for method, args in events:
+            if method in ("move_to", "click", "drag_to"):
+                self.check_point(step, args[0], args[1])
+            elif method == "scroll":
+                self.check_point(step, args[1], args[2])
+
+    def check_point(self, step, x, y):
+        if self.screen is None or x is None or y is None:
+            return
+        left, top, width, height = self.screen
+        if not (left <= x < left + width and top <= y < top + height):
+            self.analysis.out_of_bounds.append((step.index, x, y))
+
+    def check_region(self, step, region):
+        if region is not None:
+            x, y, w, h = region
+            self.check_point(step, x, y)
+            self.check_point(step, x + w - 1, y + h - 1)
+
+    def find_redundant(self, steps):
+        for step, following in zip(steps, steps[1:] + [None]):
+            if step.op_name == "repeat":
+                self.find_redundant(step.body)
+            elif step.op_name == "wait" and step.args[0] == 0:
+                self.analysis.redundant.append((step.index, "waits for 0 seconds"))
+            elif (step.op_name == "text" and not step.args[0]) or step.events == [("write", ("",))]:
+                self.analysis.redundant.append((step.index, "types nothing"))
+            elif self.is_move(step) and following is not None and self.overrides_move(step, following):
+                self.analysis.redundant.append(
+                    (step.index, f"mouse move is immediately overridden by step {following.index + 1}")
+                )
+
+    def is_move(self, step):
+        return step.op_name == "inject" and [method for method, _ in step.events] == ["move_to"]
+
+    def overrides_move(self, move, following):
+        if self.pace(move)[1] > 0:
+            # A pause leaves time for hover effects, so the move may matter
+            return self.is_move(following)
+        if following.op_name == "inject":
+            first_method, first_args = following.events[0]
+            if first_method in ("move_to", "click"):
+                return True
+        return following.op_name == "hold"
+
+
+def analyze_workflow(workflow, screen=None, **options):
+    return WorkflowAnalyzer(screen, **options).analyze(workflow)
@@ -1,7 +1,9 @@
-from PyQt6.QtWidgets import QDialog, QWidget, QVBoxLayout, QComboBox, QLabel, QLineEdit, QPushButton, QStackedWidget
+from PyQt6.QtWidgets import QDialog, QWidget, QVBoxLayout, QHBoxLayout, QComboBox, QLabel, QLineEdit, QPushButton, QStackedWidget, QCheckBox, QFileDialog, QPlainTextEdit
 from controllers.action_controller import ActionController
 from .utils import load_stylesheet
 
+MATCH_TARGET_TEXT = "Target the last image match (X/Y become offsets)"
+
 class ActionDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -13,7 +15,8 @@ class ActionDialog(QDialog):
     def init_ui(self):
         layout = QVBoxLayout()
         self.type_combo = QComboBox()
-        self.type_combo.addItems(["Click", "Hold", "Scroll", "Drag", "Keyboard", "Script", "Wait for", "Press Key", "Move Mouse To"])
+        self.type_combo.addItems(["Click", "Hold", "Scroll", "Drag", "Keyboard", "Script", "Wait for", "Press Key", "Move Mouse To",
+                                  "Repeat", "End Repeat", "Block", "End Block", "Run Block", "Wait For Image", "Wait For Change"])
         self.type_combo.currentIndexChanged.connect(self.update_params)
         layout.addWidget(QLabel("Action Type:"))
         layout.addWidget(self.type_combo)
@@ -38,6 +41,8 @@ class ActionDialog(QDialog):
         click_layout.addWidget(click_capture_btn)
         click_layout.addWidget(QLabel("Clicks:"))
         click_layout.addWidget(self.click_clicks)
+        self.click_at_match = QCheckBox(MATCH_TARGET_TEXT)
+        click_layout.addWidget(self.click_at_match)
         click_widget.setLayout(click_layout)
         self.stacked_widget.addWidget(click_widget)
 
@@ -78,6 +83,8 @@ class ActionDialog(QDialog):
         scroll_layout.addWidget(scroll_capture_btn)
         scroll_layout.addWidget(QLabel("Amount:"))
         scroll_layout.addWidget(self.scroll_amount)
+        self.scroll_at_match = QCheckBox(MATCH_TARGET_TEXT)
+        scroll_layout.addWidget(self.scroll_at_match)
         scroll_widget.setLayout(scroll_layout)
         self.stacked_widget.addWidget(scroll_widget)
 
@@ -112,9 +119,19 @@ class ActionDialog(QDialog):
         #Keyboard
         keyboard_widget = QWidget()
         keyboard_layout = QVBoxLayout()
-        self.keyboard_keys = QLineEdit()
+        self.keyboard_keys = QPlainTextEdit()
+        self.keyboard_keys.setTabChangesFocus(True)
         keyboard_layout.addWidget(QLabel("Keys:"))
         keyboard_layout.addWidget(self.keyboard_keys)
+        self.keyboard_mode = QComboBox()
+        self.keyboard_mode.addItems(["Keys", "Bulk", "Paste"])
+        self.keyboard_mode.setToolTip(
+            "Keys: press each key in turn (keyboard characters only)\n"
+            "Bulk: type any Unicode text as fast as the input backend allows\n"
+            "Paste: paste through the clipboard, then restore its previous text"
+        )
+        keyboard_layout.addWidget(QLabel("Mode:"))
+        keyboard_layout.addWidget(self.keyboard_mode)
         keyboard_widget.setLayout(keyboard_layout)
         self.stacked_widget.addWidget(keyboard_widget)
 
@@ -124,6 +141,21 @@ class ActionDialog(QDialog):
         self.script_command = QLineEdit()
         script_layout.addWidget(QLabel("Command:"))
         script_layout.addWidget(self.script_command)
+        self.script_mode = QComboBox()
+        self.script_mode.addItems(["Wait", "Join Later", "Background"])
+        self.script_mode.setToolTip(
+            "Wait: finish the command before the next action\n"
+            "Join Later: keep going and wait for the command at the end of the run\n"
+            "Background: fire and forget"
+        )
+        script_layout.addWidget(QLabel("Mode:"))
+        script_layout.addWidget(self.script_mode)
+        self.script_timeout = QLineEdit()
+        self.script_timeout.setPlaceholderText("No timeout")
+        script_layout.addWidget(QLabel("Timeout (seconds):"))
+        script_layout.addWidget(self.script_timeout)
+        self.script_isolated = QCheckBox("Run isolated (never reuse the workflow's shell)")
+        script_layout.addWidget(self.script_isolated)
         script_widget.setLayout(script_layout)
         self.stacked_widget.addWidget(script_widget)
 
@@ -159,9 +191,120 @@ class ActionDialog(QDialog):
         move_layout.addWidget(QLabel("Y:"))
         move_layout.addWidget(self.move_y)
         move_layout.addWidget(move_capture_btn)
+        self.move_at_match = QCheckBox(MATCH_TARGET_TEXT)
+        move_layout.addWidget(self.move_at_match)
         move_widget.setLayout(move_layout)
         self.stacked_widget.addWidget(move_widget)
 
+        #Repeat
+        repeat_widget = QWidget()
+        repeat_layout = QVBoxLayout()
+        self.repeat_times = QLineEdit("2")
+        self.repeat_times.setPlaceholderText("No limit")
+        self.repeat_duration = QLineEdit()
+        self.repeat_duration.setPlaceholderText("No limit")
+        repeat_layout.addWidget(QLabel("Repeats the actions up to the matching End Repeat."))
+        repeat_layout.addWidget(QLabel("Times:"))
+        repeat_layout.addWidget(self.repeat_times)
+        repeat_layout.addWidget(QLabel("Stop after (seconds):"))
+        repeat_layout.addWidget(self.repeat_duration)
+        repeat_widget.setLayout(repeat_layout)
+        self.stacked_widget.addWidget(repeat_widget)
+
+        #End Repeat
+        end_repeat_widget = QWidget()
+        end_repeat_layout = QVBoxLayout()
+        end_repeat_layout.addWidget(QLabel("Closes the nearest open Repeat."))
+        end_repeat_widget.setLayout(end_repeat_layout)
+        self.stacked_widget.addWidget(end_repeat_widget)
+
+        #Block
+        block_widget = QWidget()
+        block_layout = QVBoxLayout()
+        self.block_label = QLineEdit()
+        block_layout.addWidget(QLabel("Defines the actions up to End Block; they only run through Run Block."))
+        block_layout.addWidget(QLabel("Label:"))
+        block_layout.addWidget(self.block_label)
+        block_widget.setLayout(block_layout)
+        self.stacked_widget.addWidget(block_widget)
+
+        #End Block
+        end_block_widget = QWidget()
+        end_block_layout = QVBoxLayout()
+        end_block_layout.addWidget(QLabel("Closes the nearest open Block."))
+        end_block_widget.setLayout(end_block_layout)
+        self.stacked_widget.addWidget(end_block_widget)
+
+        #Run Block
+        run_block_widget = QWidget()
+        run_block_layout = QVBoxLayout()
+        self.run_block_label = QLineEdit()
+        run_block_layout.addWidget(QLabel("Block Label:"))
+        run_block_layout.addWidget(self.run_block_label)
+        run_block_widget.setLayout(run_block_layout)
+        self.stacked_widget.addWidget(run_block_widget)
+
+        #Wait For Image
+        image_widget = QWidget()
+        image_layout = QVBoxLayout()
+        self.image_path = QLineEdit()
+        image_browse_btn = QPushButton("Browse...")
+        image_browse_btn.clicked.connect(self.browse_image)
+        image_path_layout = QHBoxLayout()
+        image_path_layout.addWidget(self.image_path)
+        image_path_layout.addWidget(image_browse_btn)
+        self.image_region = QLineEdit()
+        self.image_region.setPlaceholderText("Whole screen")
+        self.image_timeout = QLineEdit("10")
+        self.image_interval = QLineEdit("0.1")
+        self.image_threshold = QLineEdit("0.9")
+        image_layout.addWidget(QLabel("Reference Image:"))
+        image_layout.addLayout(image_path_layout)
+        image_layout.addWidget(QLabel("Search Region (x, y, width, height):"))
+        image_layout.addWidget(self.image_region)
+        image_layout.addWidget(QLabel("Timeout (seconds):"))
+        image_layout.addWidget(self.image_timeout)
+        image_layout.addWidget(QLabel("Poll Interval (seconds):"))
+        image_layout.addWidget(self.image_interval)
+        image_layout.addWidget(QLabel("Similarity (0-1):"))
+        image_layout.addWidget(self.image_threshold)
+        image_widget.setLayout(image_layout)
+        self.stacked_widget.addWidget(image_widget)
+
+        #Wait For Change
+        change_widget = QWidget()
+        change_layout = QVBoxLayout()
+        self.change_region = QLineEdit()
+        self.change_mode = QComboBox()
+        self.change_mode.addItems(["Change", "Stable"])
+        self.change_mode.setToolTip(
+            "Change: continue as soon as the region differs from when the action started\n"
+            "Stable: continue once the region has stopped changing"
+        )
+        self.change_timeout = QLineEdit("10")
+        self.change_interval = QLineEdit("0.1")
+        self.change_tolerance = QLineEdit("0.01")
+        self.change_stable_for = QLineEdit()
+        self.change_stable_for.setPlaceholderText("One poll interval")
+        change_layout.addWidget(QLabel("Region (x, y, width, height):"))
+        change_layout.addWidget(self.change_region)
+        change_layout.addWidget(QLabel("Wait Until:"))
+        change_layout.addWidget(self.change_mode)
+        change_layout.addWidget(QLabel("Timeout (seconds):"))
+        change_layout.addWidget(self.change_timeout)
+        change_layout.addWidget(QLabel("Poll Interval (seconds):"))
+        change_layout.addWidget(self.change_interval)
+        change_layout.addWidget(QLabel("Tolerance (0-1):"))
+        change_layout.addWidget(self.change_tolerance)
+        change_layout.addWidget(QLabel("Stable For (seconds):"))
+        change_layout.addWidget(self.change_stable_for)
+        change_widget.setLayout(change_layout)
+        self.stacked_widget.addWidget(change_widget)
+
+        layout.addWidget(QLabel("Delay after action (seconds, blank = workflow pacing):"))
+        self.action_delay = QLineEdit()
+        layout.addWidget(self.action_delay)
+
         ok_btn = QPushButton("OK")
         ok_btn.clicked.connect(self.accept)
         layout.addWidget(ok_btn)
@@ -191,41 +334,90 @@ class ActionDialog(QDialog):
     def capture_coordinates(self):
         self.action_controller.capture_coordinates()
 
+    def browse_image(self):
+        filepath, _ = QFileDialog.getOpenFileName(self, "Reference Image", "", "Images (*.png *.jpg *.jpeg *.bmp)")
+        if filepath:
+            self.image_path.setText(filepath)
+
     def capture_start_coordinates(self):
         self.action_controller.capture_start_coordinates()
 
     def capture_end_coordinates(self):
         self.action_controller.capture_end_coordinates()
 
+    def coordinate(self, edit, at_match):
+        # Offsets from an image match default to 0
+        if at_match.isChecked() and not edit.text().strip():
+            return 0
+        return int(edit.text())
+
     def get_action(self):
         action_type = self.type_combo.currentText().lower()
         params = {}
         if action_type == "click":
-            params["x"] = int(self.click_x.text())
-            params["y"] = int(self.click_y.text())
+            params["x"] = self.coordinate(self.click_x, self.click_at_match)
+            params["y"] = self.coordinate(self.click_y, self.click_at_match)
             params["clicks"] = int(self.click_clicks.text())
+            if self.click_at_match.isChecked():
+                params["target"] = "match"
         elif action_type == "hold":
             params["x"] = int(self.hold_x.text())
             params["y"] = int(self.hold_y.text())
             params["duration"] = float(self.hold_duration.text())
         elif action_type == "scroll":
-            params["x"] = int(self.scroll_x.text())
-            params["y"] = int(self.scroll_y.text())
+            params["x"] = self.coordinate(self.scroll_x, self.scroll_at_match)
+            params["y"] = self.coordinate(self.scroll_y, self.scroll_at_match)
             params["amount"] = int(self.scroll_amount.text())
+            if self.scroll_at_match.isChecked():
+                params["target"] = "match"
         elif action_type == "drag":
             params["x1"] = int(self.drag_x1.text())
             params["y1"] = int(self.drag_y1.text())
             params["x2"] = int(self.drag_x2.text())
             params["y2"] = int(self.drag_y2.text())
         elif action_type == "keyboard":
-            params["keys"] = self.keyboard_keys.text()
+            params["keys"] = self.keyboard_keys.toPlainText()
+            params["mode"] = self.keyboard_mode.currentText().lower()
         elif action_type == "script":
             params["command"] = self.script_command.text()
+            params["mode"] = self.script_mode.currentText().lower()
+            if self.script_timeout.text().strip():
+                params["timeout"] = float(self.script_timeout.text())
+            if self.script_isolated.isChecked():
+                params["isolated"] = True
         elif action_type == "wait for":
             params["time"] = float(self.wait_time.text())
         elif action_type == "press key":
             params["key"] = self.press_key.text()
         elif action_type == "move mouse to":
-            params["x"] = int(self.move_x.text())
-            params["y"] = int(self.move_y.text())
+            params["x"] = self.coordinate(self.move_x, self.move_at_match)
+            params["y"] = self.coordinate(self.move_y, self.move_at_match)
+            if self.move_at_match.isChecked():
+                params["target"] = "match"
+        elif action_type == "repeat":
+            params["times"] = int(self.repeat_times.text()) if self.repeat_times.text().strip() else 0
+            if self.repeat_duration.text().strip():
+                params["duration"] = float(self.repeat_duration.text())
+        elif action_type == "block":
+            params["label"] = self.block_label.text().strip()
+        elif action_type == "run block":
+            params["label"] = self.run_block_label.text().strip()
+        elif action_type == "wait for image":
+            params["image"] = self.image_path.text().strip()
+            region = [part.strip() for part in self.image_region.text().split(",") if part.strip()]
+            if region:
+                params["region"] = [int(value) for value in region]
+            params["timeout"] = float(self.image_timeout.text())
+            params["interval"] = float(self.image_interval.text())
+            params["threshold"] = float(self.image_threshold.text())
+        elif action_type == "wait for change":
+            params["region"] = [int(part) for part in self.change_region.text().split(",") if part.strip()]
+            params["mode"] = self.change_mode.currentText().lower()
+            params["timeout"] = float(self.change_timeout.text())
+            params["interval"] = float(self.change_interval.text())
+            params["tolerance"] = float(self.change_tolerance.text())
+            if self.change_stable_for.text().strip():
+                params["stable_for"] = float(self.change_stable_for.text())
+        if self.action_delay.text().strip():
+            params["delay"] = float(self.action_delay.text())
         return self.action_controller.create_action(action_type, params)
\ No newline at end of file
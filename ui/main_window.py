@@ -5,10 +5,13 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QIcon, QAction
 import os
+import queue
 import sys
 from .workflow_window import WorkflowWindow
 from .settings_dialog import SettingsDialog
-from controllers.workflow_controller import WorkflowController
+from controllers.workflow_controller import WorkflowCache, WorkflowController
+from services.execution_engine import get_engine, shutdown_engine
+from services.scheduling_service import get_scheduler, shutdown_scheduler
 from .utils import load_stylesheet
 
 class MainWindow(QMainWindow):
@@ -18,10 +21,12 @@ class MainWindow(QMainWindow):
         self.setWindowTitle("Clicky")
         self.setGeometry(100, 100, 400, 300)
         self.workflow_controller = WorkflowController()
+        self.scheduled_workflows = WorkflowCache()
         self.workflow_windows = []
         self.setup_tray_icon()
         self.init_ui()
         self.apply_theme()
+        self.restore_schedules()
         
     def setup_tray_icon(self):
         self.tray_icon = QSystemTrayIcon(self)
@@ -89,6 +94,8 @@ class MainWindow(QMainWindow):
         for window in self.workflow_windows[:]:
             window.close()
         
+        shutdown_scheduler()
+        shutdown_engine()
         self.tray_icon.hide()
         QApplication.quit()
 
@@ -131,6 +138,38 @@ class MainWindow(QMainWindow):
 
         self.load_workflows()
 
+    def restore_schedules(self):
+        """Pick up the schedules that were active when the app last closed"""
+        restored = get_scheduler().restore(self.scheduled_run)
+        if restored:
+            self.status_bar.showMessage(f"Restored {restored} scheduled execution(s)")
+
+    def scheduled_run(self, path):
+        # Windows schedule saved workflows under their file path; other keys can't be reloaded
+        if not os.path.isfile(path):
+            return None
+
+        def on_finished(request):
+            if request.error is not None:
+                print(f"Scheduled run of '{path}' failed: {request.error}")
+            get_scheduler().record_finished(path, request.error)
+
+        def run():
+            # Called from the scheduler thread; the workflow file is only read when it is due
+            try:
+                workflow = self.scheduled_workflows.load(path)
+            except Exception as e:
+                print(f"Could not load scheduled workflow '{path}': {e}")
+                return
+            try:
+                # Never wait on a full run queue here, it would hold up every other trigger
+                engine = get_engine(self.settings.input_backend)
+                engine.submit(workflow, on_finished=on_finished, block=False, key=path,
+                              on_log=lambda line: print(f"{workflow.name}: {line}"))
+            except queue.Full:
+                print(f"Run queue is full, skipping the scheduled run of '{path}'")
+        return run
+
     def apply_theme(self):
         self.setStyleSheet(load_stylesheet(self.settings.theme))
 
@@ -163,7 +202,8 @@ class MainWindow(QMainWindow):
     def open_workflow_by_name(self, workflow_name):
         try:
             workflow = self.workflow_controller.load_workflow(workflow_name)
-            workflow_window = WorkflowWindow(workflow, self.workflow_controller, self)
+            workflow_window = WorkflowWindow(workflow, self.workflow_controller, self,
+                                             self.workflow_controller.workflow_path(workflow_name))
             workflow_window.apply_theme(self.settings.theme)
             workflow_window.show()
             self.workflow_windows.append(workflow_window)
@@ -180,8 +220,14 @@ class MainWindow(QMainWindow):
                                          QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
             if reply == QMessageBox.StandardButton.Yes:
                 try:
-                    import os
-                    os.remove(os.path.join(self.workflow_controller.workflows_dir, workflow_name + ".json"))
+                    path = self.workflow_controller.workflow_path(workflow_name)
+                    os.remove(path)
+                    # Its schedules would otherwise be restored, and fail, on every start
+                    get_scheduler().clear_jobs_for_workflow(path)
+                    self.scheduled_workflows.discard(path)
+                    for window in self.workflow_windows:
+                        if window.schedule_key == path:
+                            window.schedule_key = None
                     self.load_workflows()
                     self.status_bar.showMessage(f"Deleted workflow: {workflow_name}")
                 except Exception as e:
@@ -231,6 +277,8 @@ class MainWindow(QMainWindow):
             if reply == QMessageBox.StandardButton.Yes:
                 for window in self.workflow_windows[:]:
                     window.close()
+                shutdown_scheduler()
+                shutdown_engine()
                 event.accept()
             else:
                 event.ignore()
\ No newline at end of file
@@ -1,6 +1,7 @@
 from PyQt6.QtWidgets import QDialog, QVBoxLayout, QCheckBox, QComboBox, QPushButton, QLabel, QHBoxLayout
 import os
 from models.settings import Settings
+from services.input_backends import available_backends
 from .utils import load_stylesheet, get_data_directory
 
 class SettingsDialog(QDialog):
@@ -26,6 +27,19 @@ class SettingsDialog(QDialog):
         self.auto_load_last_workflow_cb.setChecked(self.settings.auto_load_last_workflow)
         layout.addWidget(self.auto_load_last_workflow_cb)
         
+        backend_layout = QHBoxLayout()
+        backend_layout.addWidget(QLabel("Input backend:"))
+        self.input_backend_combo = QComboBox()
+        backends = available_backends()
+        if self.settings.input_backend not in backends:
+            # Keep the saved choice visible even if it can't start here
+            backends.append(self.settings.input_backend)
+        self.input_backend_combo.addItems(backends)
+        self.input_backend_combo.setCurrentText(self.settings.input_backend)
+        self.input_backend_combo.setToolTip("Takes effect after restarting Clicky")
+        backend_layout.addWidget(self.input_backend_combo)
+        layout.addLayout(backend_layout)
+        
         layout.addWidget(QLabel("<b>Appearance</b>"))
         
         theme_layout = QHBoxLayout()
@@ -58,6 +72,7 @@ class SettingsDialog(QDialog):
         self.settings.run_in_background = self.run_in_background_cb.isChecked()
         self.settings.auto_load_last_workflow = self.auto_load_last_workflow_cb.isChecked()
         self.settings.theme = self.theme_combo.currentText()
+        self.settings.input_backend = self.input_backend_combo.currentText()
         
         try:
             settings_path = os.path.join(get_data_directory(), "settings.json")
@@ -0,0 +1,46 @@
+from PyQt6.QtCore import QObject, QRunnable, pyqtSignal
+from services.cancellation import RunCancelled
+
+class WorkflowRunnerSignals(QObject):
+    queued = pyqtSignal()
+    progress = pyqtSignal(int, int)
+    action_finished = pyqtSignal(int, str)
+    finished = pyqtSignal(float, float)
+    cancelled = pyqtSignal(str)
+    error = pyqtSignal(str)
+    log = pyqtSignal(str)
+
+class WorkflowRunner(QRunnable):
+    """Submits one run to the execution engine from a pool thread and reports back through signals
+
+    The signals are emitted from worker threads; slots on widgets receive them
+    as queued calls on the GUI thread.
+    """
+
+    def __init__(self, engine, workflow, on_finished=None, key=None):
+        super().__init__()
+        self.engine = engine
+        self.workflow = workflow
+        self.key = key
+        # Passed to the engine, so it is called from an engine worker thread
+        self.on_finished = on_finished
+        self.signals = WorkflowRunnerSignals()
+
+    def on_step_finished(self, step, done, total):
+        for action_step in getattr(step, "steps", [step]):
+            self.signals.action_finished.emit(action_step.index, action_step.action_type)
+        self.signals.progress.emit(done, total)
+
+    def run(self):
+        try:
+            # submit() blocks while the run queue is full, so keep it off the GUI and scheduler threads
+            request = self.engine.submit(self.workflow, on_finished=self.on_finished,
+                                         on_step_finished=self.on_step_finished, key=self.key,
+                                         on_log=self.signals.log.emit)
+            self.signals.queued.emit()
+            run = request.result()
+            self.signals.finished.emit(request.queue_wait_ms, run.timer.drift_ns / 1e6)
+        except RunCancelled as e:
+            self.signals.cancelled.emit(str(e))
+        except Exception as e:
+            self.signals.error.emit(str(e))
@@ -2,21 +2,33 @@ from PyQt6.QtWidgets import (
     QMainWindow, QVBoxLayout, QStatusBar, QHBoxLayout, QWidget, QLabel, 
     QLineEdit, QPushButton, QTreeWidget, QTreeWidgetItem, QInputDialog, 
     QMessageBox, QGroupBox, QDateTimeEdit, QSpinBox, QScrollArea, QCheckBox,
-    QTimeEdit
+    QTimeEdit, QComboBox, QDoubleSpinBox, QFileDialog, QApplication, QPlainTextEdit
 )
 from PyQt6.QtCore import Qt, QThreadPool, QDateTime, QTime
 from .action_dialog import ActionDialog
-from services.automation_service import AutomationService
-from services.scheduling_service import SchedulingService
+from .workflow_runner import WorkflowRunner
+from services.execution_engine import get_engine
+from services.scheduling_service import get_scheduler
 from .utils import load_stylesheet
 from datetime import datetime
+import itertools
+
+_unsaved_windows = itertools.count(1)
 
 class ScheduleWidget(QWidget):
-    def __init__(self, parent=None, datetime_val=None, repeat_interval=None, execution_count=0, is_daily=False):
+    MISFIRE_LABELS = {
+        "fire_once": "Run once late",
+        "skip": "Skip missed runs",
+        "catch_up": "Catch up missed runs",
+    }
+
+    def __init__(self, parent=None, datetime_val=None, repeat_interval=None, execution_count=0, is_daily=False,
+                 misfire_policy="fire_once", catch_up_limit=3, cron=None):
         super().__init__(parent)
-        self.init_ui(datetime_val, repeat_interval, execution_count, is_daily)
+        self.init_ui(datetime_val, repeat_interval, execution_count, is_daily, misfire_policy, catch_up_limit, cron)
         
-    def init_ui(self, datetime_val, repeat_interval, execution_count, is_daily):
+    def init_ui(self, datetime_val, repeat_interval, execution_count, is_daily, misfire_policy, catch_up_limit,
+                cron):
         layout = QVBoxLayout()
         self.setLayout(layout)
         
@@ -86,6 +98,18 @@ class ScheduleWidget(QWidget):
             
         repeat_layout.addWidget(self.repeat_interval_spin)
         layout.addLayout(repeat_layout)
+
+        cron_layout = QHBoxLayout()
+        cron_layout.addWidget(QLabel("Cron Expression:"))
+        self.cron_edit = QLineEdit(cron or "")
+        self.cron_edit.setPlaceholderText("optional, e.g. 0 9 * * mon-fri")
+        self.cron_edit.setToolTip(
+            "minute hour day-of-month month day-of-week, or @hourly/@daily/@weekly/@monthly.\n"
+            "L as the day of the month is the last day. When set, this replaces the daily time\n"
+            "and repeat interval; a date and time in the future is when it starts to apply."
+        )
+        cron_layout.addWidget(self.cron_edit)
+        layout.addLayout(cron_layout)
         
         executions_layout = QHBoxLayout()
         executions_layout.addWidget(QLabel("Number of Executions:"))
@@ -100,6 +124,24 @@ class ScheduleWidget(QWidget):
             
         executions_layout.addWidget(self.execution_count_spin)
         layout.addLayout(executions_layout)
+
+        misfire_layout = QHBoxLayout()
+        misfire_layout.addWidget(QLabel("If Missed:"))
+        self.misfire_combo = QComboBox()
+        for policy, label in self.MISFIRE_LABELS.items():
+            self.misfire_combo.addItem(label, policy)
+        self.misfire_combo.setToolTip("What to do with runs that were due while the app was busy or the computer slept")
+        self.misfire_combo.setCurrentIndex(max(0, self.misfire_combo.findData(misfire_policy)))
+        self.misfire_combo.currentIndexChanged.connect(self.toggle_catch_up)
+        misfire_layout.addWidget(self.misfire_combo)
+        self.catch_up_spin = QSpinBox()
+        self.catch_up_spin.setRange(1, 1000)
+        self.catch_up_spin.setPrefix("up to ")
+        self.catch_up_spin.setSuffix(" runs")
+        self.catch_up_spin.setValue(int(catch_up_limit))
+        misfire_layout.addWidget(self.catch_up_spin)
+        layout.addLayout(misfire_layout)
+        self.toggle_catch_up()
         
         separator = QWidget()
         separator.setFixedHeight(1)
@@ -118,6 +160,9 @@ class ScheduleWidget(QWidget):
         if is_daily:
             self.time_only_edit.setTime(self.date_time_edit.time())
     
+    def toggle_catch_up(self):
+        self.catch_up_spin.setVisible(self.misfire_combo.currentData() == "catch_up")
+
     def get_data(self):
         """Return the schedule data as a dictionary"""
         is_daily = self.daily_checkbox.isChecked()
@@ -127,6 +172,9 @@ class ScheduleWidget(QWidget):
                 "execution_datetime": self.time_only_edit.time().toString("HH:mm:ss"),
                 "repeat_interval": self.repeat_interval_spin.value() if self.repeat_interval_spin.value() > 0 else None,
                 "execution_count": self.execution_count_spin.value(),
+                "misfire_policy": self.misfire_combo.currentData(),
+                "catch_up_limit": self.catch_up_spin.value(),
+                "cron": self.cron_edit.text().strip() or None,
                 "is_daily": True
             }
         else:
@@ -134,18 +182,26 @@ class ScheduleWidget(QWidget):
                 "execution_datetime": self.date_time_edit.dateTime().toString("yyyy-MM-dd HH:mm:ss"),
                 "repeat_interval": self.repeat_interval_spin.value() if self.repeat_interval_spin.value() > 0 else None,
                 "execution_count": self.execution_count_spin.value(),
+                "misfire_policy": self.misfire_combo.currentData(),
+                "catch_up_limit": self.catch_up_spin.value(),
+                "cron": self.cron_edit.text().strip() or None,
                 "is_daily": False
             }
 
 class WorkflowWindow(QMainWindow):
-    def __init__(self, workflow, workflow_controller, parent=None):
+    def __init__(self, workflow, workflow_controller, parent=None, file_path=None):
         super().__init__(parent)
         self.workflow = workflow
         self.workflow_controller = workflow_controller
-        self.automation_service = AutomationService()
-        self.scheduling_service = SchedulingService()
-        self.threadpool = QThreadPool()
         self.parent_window = parent
+        # The shared scheduler knows this window's jobs by schedule_key: the file path once
+        # the workflow is saved, so windows with the same workflow name don't collide
+        self.file_path = file_path
+        self.unsaved_key = f"unsaved:{next(_unsaved_windows)}"
+        self.schedule_key = None
+        self.engine = get_engine(self.input_backend_name())
+        self.scheduling_service = get_scheduler()
+        self.threadpool = QThreadPool()
         self.setWindowTitle(f"Workflow: {self.workflow.name}")
         self.setGeometry(200, 200, 800, 600)
         self.schedule_widgets = []
@@ -188,6 +244,49 @@ class WorkflowWindow(QMainWindow):
         
         main_layout.addWidget(actions_group)
 
+        pacing_group = QGroupBox("Pacing")
+        pacing_layout = QHBoxLayout(pacing_group)
+        pacing = self.workflow.pacing
+
+        pacing_layout.addWidget(QLabel("Mode:"))
+        self.pacing_mode_combo = QComboBox()
+        self.pacing_mode_combo.addItems(["Fixed", "Fast", "Adaptive"])
+        self.pacing_mode_combo.setCurrentText(pacing.mode.capitalize())
+        self.pacing_mode_combo.setToolTip(
+            "Fixed: wait the delay after every action\n"
+            "Fast: no delay between actions\n"
+            "Adaptive: wait the minimum delay, then until the settle region stops changing"
+        )
+        self.pacing_mode_combo.currentTextChanged.connect(self.toggle_pacing_mode)
+        pacing_layout.addWidget(self.pacing_mode_combo)
+
+        self.pacing_delay_label = QLabel("Delay (s):")
+        pacing_layout.addWidget(self.pacing_delay_label)
+        self.pacing_delay_spin = QDoubleSpinBox()
+        self.pacing_delay_spin.setRange(0, 3600)
+        self.pacing_delay_spin.setDecimals(3)
+        self.pacing_delay_spin.setSingleStep(0.05)
+        self.pacing_delay_spin.setValue(pacing.delay)
+        pacing_layout.addWidget(self.pacing_delay_spin)
+
+        self.pacing_settle_label = QLabel("Settle region (x, y, w, h):")
+        pacing_layout.addWidget(self.pacing_settle_label)
+        self.pacing_settle_edit = QLineEdit(
+            ", ".join(str(value) for value in pacing.settle_region) if pacing.settle_region else ""
+        )
+        self.pacing_settle_edit.setPlaceholderText("blank = latency floor only")
+        pacing_layout.addWidget(self.pacing_settle_edit)
+
+        main_layout.addWidget(pacing_group)
+        self.toggle_pacing_mode()
+
+        self.persistent_shell_cb = QCheckBox("Reuse one shell for script actions")
+        self.persistent_shell_cb.setToolTip(
+            "Pipe 'Wait' script actions into a single shell kept open for the run instead of starting a new one each time"
+        )
+        self.persistent_shell_cb.setChecked(self.workflow.persistent_shell)
+        main_layout.addWidget(self.persistent_shell_cb)
+
         schedule_group = QGroupBox("Execution Schedule")
         schedule_layout = QVBoxLayout(schedule_group)
         
@@ -212,6 +311,15 @@ class WorkflowWindow(QMainWindow):
         
         self.load_schedules()
 
+        log_group = QGroupBox("Run Log")
+        log_layout = QVBoxLayout(log_group)
+        self.run_log = QPlainTextEdit()
+        self.run_log.setReadOnly(True)
+        self.run_log.setMaximumBlockCount(1000)
+        self.run_log.setPlaceholderText("Script output and image matches of runs started here")
+        log_layout.addWidget(self.run_log)
+        main_layout.addWidget(log_group)
+
         control_btn_layout = QHBoxLayout()
         save_btn = QPushButton("Save")
         save_btn.clicked.connect(self.save_workflow)
@@ -222,6 +330,18 @@ class WorkflowWindow(QMainWindow):
         stop_btn = QPushButton("Stop")
         stop_btn.clicked.connect(self.stop_workflow)
         control_btn_layout.addWidget(stop_btn)
+        dry_run_btn = QPushButton("Dry Run")
+        dry_run_btn.setToolTip("Check the workflow and estimate its duration without moving the mouse or typing")
+        dry_run_btn.clicked.connect(self.dry_run)
+        control_btn_layout.addWidget(dry_run_btn)
+        analyze_btn = QPushButton("Analyze")
+        analyze_btn.setToolTip("Estimate the run time and list off-screen, redundant and slowest steps")
+        analyze_btn.clicked.connect(self.analyze_workflow)
+        control_btn_layout.addWidget(analyze_btn)
+        export_timings_btn = QPushButton("Export Timings")
+        export_timings_btn.setToolTip("Save per-action timings and latency percentiles of recent runs")
+        export_timings_btn.clicked.connect(self.export_timings)
+        control_btn_layout.addWidget(export_timings_btn)
         main_layout.addLayout(control_btn_layout)
 
         self.status_bar = QStatusBar()
@@ -231,14 +351,59 @@ class WorkflowWindow(QMainWindow):
         self.setCentralWidget(main_widget)
         self.load_actions()
 
+    def input_backend_name(self):
+        if hasattr(self.parent_window, 'settings') and hasattr(self.parent_window.settings, 'input_backend'):
+            return self.parent_window.settings.input_backend
+        return "pyautogui"
+
     def apply_theme(self, theme="Default"):
         self.setStyleSheet(load_stylesheet(theme))
 
+    def toggle_pacing_mode(self):
+        mode = self.pacing_mode_combo.currentText()
+        self.pacing_delay_label.setText("Minimum delay (s):" if mode == "Adaptive" else "Delay (s):")
+        self.pacing_delay_spin.setValue(
+            self.workflow.pacing.min_delay if mode == "Adaptive" else self.workflow.pacing.delay
+        )
+        self.pacing_delay_spin.setEnabled(mode != "Fast")
+        self.pacing_settle_label.setVisible(mode == "Adaptive")
+        self.pacing_settle_edit.setVisible(mode == "Adaptive")
+
+    def apply_pacing(self):
+        """Copy the pacing controls into the workflow; returns False if the settle region is invalid"""
+        pacing = self.workflow.pacing
+        mode = self.pacing_mode_combo.currentText().lower()
+        settle_region = None
+        if mode == "adaptive" and self.pacing_settle_edit.text().strip():
+            try:
+                settle_region = tuple(int(part) for part in self.pacing_settle_edit.text().split(","))
+            except ValueError:
+                settle_region = ()
+            if len(settle_region) != 4 or settle_region[2] <= 0 or settle_region[3] <= 0:
+                QMessageBox.warning(self, "Warning",
+                                    "Settle region must be x, y, width, height with a positive width and height.")
+                self.status_bar.showMessage("Invalid settle region")
+                return False
+
+        pacing.mode = mode
+        if mode == "adaptive":
+            pacing.min_delay = self.pacing_delay_spin.value()
+            pacing.settle_region = settle_region
+        elif mode == "fixed":
+            pacing.delay = self.pacing_delay_spin.value()
+        return True
+
     def load_actions(self):
         self.actions_tree.clear()
+        depth = 0
         for action in self.workflow.actions:
-            item = QTreeWidgetItem([action.action_type.capitalize(), str(action.params)])
+            # Indent the actions inside repeats and blocks
+            if action.action_type in ("end repeat", "end block"):
+                depth = max(0, depth - 1)
+            item = QTreeWidgetItem(["    " * depth + action.action_type.capitalize(), str(action.params)])
             self.actions_tree.addTopLevelItem(item)
+            if action.action_type in ("repeat", "block"):
+                depth += 1
     
     def load_schedules(self):
         self.clear_schedules(confirm=False)
@@ -254,7 +419,10 @@ class WorkflowWindow(QMainWindow):
                     scheduled_execution.execution_datetime,
                     scheduled_execution.repeat_interval,
                     scheduled_execution.execution_count,
-                    is_daily
+                    is_daily,
+                    scheduled_execution.misfire_policy,
+                    scheduled_execution.catch_up_limit,
+                    scheduled_execution.cron
                 )
         elif self.workflow.start_time:
             is_daily = False
@@ -272,13 +440,14 @@ class WorkflowWindow(QMainWindow):
         self.add_schedule_widget()
         self.status_bar.showMessage("Added new execution time")
     
-    def add_schedule_widget(self, datetime_val=None, repeat_interval=None, execution_count=0, is_daily=False):
+    def add_schedule_widget(self, datetime_val=None, repeat_interval=None, execution_count=0, is_daily=False,
+                            misfire_policy="fire_once", catch_up_limit=3, cron=None):
         container = QWidget()
         container_layout = QHBoxLayout(container)
         container_layout.setContentsMargins(0, 0, 0, 0)
         
         schedule_widget = ScheduleWidget(
-            self, datetime_val, repeat_interval, execution_count, is_daily
+            self, datetime_val, repeat_interval, execution_count, is_daily, misfire_policy, catch_up_limit, cron
         )
         container_layout.addWidget(schedule_widget, 1)
         
@@ -360,6 +529,7 @@ class WorkflowWindow(QMainWindow):
                 dialog.click_x.setText(str(params.get("x", "")))
                 dialog.click_y.setText(str(params.get("y", "")))
                 dialog.click_clicks.setText(str(params.get("clicks", "1")))
+                dialog.click_at_match.setChecked(params.get("target") == "match")
             elif action_type_lower == "hold":
                 dialog.hold_x.setText(str(params.get("x", "")))
                 dialog.hold_y.setText(str(params.get("y", "")))
@@ -368,15 +538,21 @@ class WorkflowWindow(QMainWindow):
                 dialog.scroll_x.setText(str(params.get("x", "")))
                 dialog.scroll_y.setText(str(params.get("y", "")))
                 dialog.scroll_amount.setText(str(params.get("amount", "10")))
+                dialog.scroll_at_match.setChecked(params.get("target") == "match")
             elif action_type_lower == "drag":
                 dialog.drag_x1.setText(str(params.get("x1", "")))
                 dialog.drag_y1.setText(str(params.get("y1", "")))
                 dialog.drag_x2.setText(str(params.get("x2", "")))
                 dialog.drag_y2.setText(str(params.get("y2", "")))
             elif action_type_lower == "keyboard":
-                dialog.keyboard_keys.setText(params.get("keys", ""))
+                dialog.keyboard_keys.setPlainText(params.get("keys", ""))
+                dialog.keyboard_mode.setCurrentText(params.get("mode", "keys").title())
             elif action_type_lower == "script":
                 dialog.script_command.setText(params.get("command", ""))
+                dialog.script_mode.setCurrentText(params.get("mode", "wait").title())
+                if params.get("timeout") is not None:
+                    dialog.script_timeout.setText(str(params["timeout"]))
+                dialog.script_isolated.setChecked(params.get("isolated", False))
             elif action_type_lower == "wait for":
                 dialog.wait_time.setText(str(params.get("time", "1")))
             elif action_type_lower == "press key":
@@ -384,6 +560,33 @@ class WorkflowWindow(QMainWindow):
             elif action_type_lower == "move mouse to":
                 dialog.move_x.setText(str(params.get("x", "")))
                 dialog.move_y.setText(str(params.get("y", "")))
+                dialog.move_at_match.setChecked(params.get("target") == "match")
+            elif action_type_lower == "repeat":
+                dialog.repeat_times.setText(str(params["times"]) if params.get("times") else "")
+                if params.get("duration") is not None:
+                    dialog.repeat_duration.setText(str(params["duration"]))
+            elif action_type_lower == "block":
+                dialog.block_label.setText(params.get("label", ""))
+            elif action_type_lower == "run block":
+                dialog.run_block_label.setText(params.get("label", ""))
+            elif action_type_lower == "wait for image":
+                dialog.image_path.setText(params.get("image", ""))
+                if params.get("region"):
+                    dialog.image_region.setText(", ".join(str(value) for value in params["region"]))
+                dialog.image_timeout.setText(str(params.get("timeout", 10)))
+                dialog.image_interval.setText(str(params.get("interval", 0.1)))
+                dialog.image_threshold.setText(str(params.get("threshold", 0.9)))
+            elif action_type_lower == "wait for change":
+                dialog.change_region.setText(", ".join(str(value) for value in params.get("region", [])))
+                dialog.change_mode.setCurrentText(params.get("mode", "change").title())
+                dialog.change_timeout.setText(str(params.get("timeout", 10)))
+                dialog.change_interval.setText(str(params.get("interval", 0.1)))
+                dialog.change_tolerance.setText(str(params.get("tolerance", 0.01)))
+                if params.get("stable_for") is not None:
+                    dialog.change_stable_for.setText(str(params["stable_for"]))
+
+            if params.get("delay") is not None:
+                dialog.action_delay.setText(str(params["delay"]))
                 
             if dialog.exec():
                 new_action = dialog.get_action()
@@ -407,6 +610,9 @@ class WorkflowWindow(QMainWindow):
 
     def save_workflow(self):
         self.workflow.name = self.name_edit.text()
+        if not self.apply_pacing():
+            return
+        self.workflow.persistent_shell = self.persistent_shell_cb.isChecked()
         
         self.workflow.scheduled_executions = []
         
@@ -415,13 +621,16 @@ class WorkflowWindow(QMainWindow):
             self.workflow.add_scheduled_execution(
                 execution_datetime=schedule_data["execution_datetime"],
                 repeat_interval=schedule_data["repeat_interval"],
-                execution_count=schedule_data["execution_count"]
+                execution_count=schedule_data["execution_count"],
+                misfire_policy=schedule_data["misfire_policy"],
+                catch_up_limit=schedule_data["catch_up_limit"],
+                cron=schedule_data["cron"]
             )
         
         filename, ok = QInputDialog.getText(self, "Save Workflow", "Enter filename:", text=self.workflow.name)
         if ok and filename:
             try:
-                self.workflow_controller.save_workflow(self.workflow, filename)
+                self.file_path = self.workflow_controller.save_workflow(self.workflow, filename)
                 QMessageBox.information(self, "Success", "Workflow saved.")
                 self.status_bar.showMessage("Workflow saved")
             except Exception as e:
@@ -429,15 +638,33 @@ class WorkflowWindow(QMainWindow):
                 self.status_bar.showMessage(f"Error saving workflow: {e}")
 
     def start_workflow(self):
+        if not self.apply_pacing():
+            return
+        self.workflow.persistent_shell = self.persistent_shell_cb.isChecked()
         self.workflow.scheduled_executions = []
         for _, schedule_widget in self.schedule_widgets:
             schedule_data = schedule_widget.get_data()
             self.workflow.add_scheduled_execution(
                 execution_datetime=schedule_data["execution_datetime"],
                 repeat_interval=schedule_data["repeat_interval"],
-                execution_count=schedule_data["execution_count"]
+                execution_count=schedule_data["execution_count"],
+                misfire_policy=schedule_data["misfire_policy"],
+                catch_up_limit=schedule_data["catch_up_limit"],
+                cron=schedule_data["cron"]
             )
-        
+
+        key = self.file_path or self.unsaved_key
+        try:
+            warnings = self.scheduling_service.schedule_workflow(self.workflow, lambda: self.run_workflow(key), key)
+        except ValueError as e:
+            QMessageBox.critical(self, "Error", f"Failed to schedule workflow: {e}")
+            self.status_bar.showMessage(f"Error scheduling workflow: {e}")
+            return
+        if self.schedule_key not in (None, key):
+            # Saved under a new file since it was last started
+            self.scheduling_service.clear_jobs_for_workflow(self.schedule_key)
+        self.schedule_key = key
+
         QMessageBox.information(
             self, 
             "Workflow Scheduled",
@@ -447,19 +674,99 @@ class WorkflowWindow(QMainWindow):
             "3. Daily schedules will execute every day at the specified time as long as the app is running.\n"
             "4. Consider adding this application to your startup programs if you want workflows to run automatically."
         )
-            
-        self.scheduling_service.schedule_workflow(self.workflow, self.run_workflow)
-        self.scheduling_service.start_scheduler()
+        if warnings:
+            QMessageBox.warning(self, "Schedule Warning", "\n".join(warnings))
         self.status_bar.showMessage("Workflow started")
 
-    def run_workflow(self):
+    def run_workflow(self, key):
+        # Called from the scheduler thread: only touch widgets through the runner's signals
+        runner = WorkflowRunner(self.engine, self.workflow,
+                                lambda request: self.scheduling_service.record_finished(key, request.error), key)
+        runner.signals.queued.connect(self.on_run_queued)
+        runner.signals.progress.connect(self.on_run_progress)
+        runner.signals.action_finished.connect(self.on_action_finished)
+        runner.signals.finished.connect(self.on_run_finished)
+        runner.signals.cancelled.connect(self.on_run_cancelled)
+        runner.signals.error.connect(self.on_run_error)
+        runner.signals.log.connect(self.run_log.appendPlainText)
+        self.threadpool.start(runner)
+
+    def on_run_queued(self):
+        self.status_bar.showMessage("Workflow queued")
+
+    def on_run_progress(self, done, total):
+        self.status_bar.showMessage(f"Running workflow: step {done}/{total}")
+
+    def on_action_finished(self, index, action_type):
+        item = self.actions_tree.topLevelItem(index)
+        if item is not None:
+            self.actions_tree.setCurrentItem(item)
+
+    def on_run_finished(self, queue_wait_ms, drift_ms):
+        self.status_bar.showMessage(
+            f"Workflow executed (queued {queue_wait_ms:.0f} ms, timing drift {drift_ms:.2f} ms)"
+        )
+
+    def on_run_cancelled(self, reason):
+        self.status_bar.showMessage(reason)
+
+    def on_run_error(self, message):
+        QMessageBox.critical(self, "Error", f"Workflow execution failed: {message}")
+        self.status_bar.showMessage(f"Error: {message}")
+
+    def export_timings(self):
+        filepath, selected_filter = QFileDialog.getSaveFileName(
+            self, "Export Timings", f"{self.workflow.name}_timings.csv", "CSV (*.csv);;JSON (*.json)"
+        )
+        if not filepath:
+            return
+        
         try:
-            self.automation_service.execute_workflow(self.workflow)
-            self.status_bar.showMessage("Workflow executed")
+            if filepath.lower().endswith(".json") or selected_filter.startswith("JSON"):
+                self.engine.service.tracer.export_json(filepath)
+            else:
+                self.engine.service.tracer.export_csv(filepath)
+            self.status_bar.showMessage(f"Timings exported to {filepath}")
         except Exception as e:
-            QMessageBox.critical(self, "Error", f"Workflow execution failed: {e}")
-            self.status_bar.showMessage(f"Error: {e}")
+            QMessageBox.critical(self, "Error", f"Failed to export timings: {e}")
+            self.status_bar.showMessage(f"Error exporting timings: {e}")
+
+    def dry_run(self):
+        if not self.apply_pacing():
+            return
+        from services.simulation import simulate_workflow
+        desktop = QApplication.primaryScreen().virtualGeometry()
+        # Runs on the GUI thread, so stop huge repeat counts after about a second
+        result = simulate_workflow(self.workflow, desktop.width(), desktop.height(), desktop.x(), desktop.y(),
+                                   max_steps=50000)
+        lines = [f"Estimated duration: {result.duration:.2f} s ({len(result.events)} events)"]
+        if result.error:
+            lines.append(f"Error: {result.error}")
+        for index, x, y in result.out_of_bounds:
+            where = f"Step {index + 1}" if index is not None else "Pacing settle region"
+            lines.append(f"{where}: ({x}, {y}) is off the screen")
+        lines.extend(result.notes)
+        if result.ok:
+            QMessageBox.information(self, "Dry Run", "\n".join(lines))
+        else:
+            QMessageBox.warning(self, "Dry Run", "\n".join(lines))
+        self.status_bar.showMessage("Dry run passed" if result.ok else "Dry run found problems")
+
+    def analyze_workflow(self):
+        if not self.apply_pacing():
+            return
+        desktop = QApplication.primaryScreen().virtualGeometry()
+        analysis = self.workflow.analyze((desktop.x(), desktop.y(), desktop.width(), desktop.height()))
+        if analysis.ok:
+            QMessageBox.information(self, "Analysis", "\n".join(analysis.summary()))
+        else:
+            QMessageBox.warning(self, "Analysis", "\n".join(analysis.summary()))
 
     def stop_workflow(self):
-        self.scheduling_service.clear_jobs_for_workflow(self.workflow.name)
+        # Schedules restored at startup are keyed by the file path though this window never started them
+        for key in {self.schedule_key, self.file_path} - {None}:
+            if self.scheduling_service.has_jobs(key):
+                self.scheduling_service.clear_jobs_for_workflow(key)
+            self.engine.cancel_workflow(key)
+        self.schedule_key = None
         self.status_bar.showMessage("Workflow stopped")